@@ -1,6 +1,55 @@
+import functools
+import re
+import sys
 from enum import Enum, auto
-from typing import List, Dict, Optional
-from llm_client import LLMClient
+from typing import Any, Dict, Generator, Iterator, List, Optional, Tuple
+from llm_client import LLMClient, count_tokens
+
+# Stage handlers are generators: they yield (messages, get_response kwargs, verbatim)
+# for each LLM call they need, receive the response text back, and return the reply
+# for the user. "verbatim" marks responses shown to the user unchanged, which can
+# therefore be streamed. This keeps the conversation logic independent of how the
+# LLM is called (blocking, async or streaming).
+LLMRequest = Tuple[List[Dict[str, str]], Dict[str, Any], bool]
+Turn = Generator[LLMRequest, str, str]
+
+ROLE_SELECTION_PROMPT = (
+    "You are a helpful assistant designed to help users prepare for job interviews. Your goal is to facilitate a mock interview practice session. "
+    "When the user provides input for the role they want to practice: if they specified a valid role, respond ONLY with 'Role Confirmed: [Role Name]' on the first line, "
+    "followed by a short welcome as the interviewer for that role and the first interview question, tailored to that role. "
+    "If the input is unclear, just ask for clarification."
+)
+
+# Static part of the interview system prompt. It comes first so that every interview,
+# whatever the role, starts with the same bytes; the role-specific sentence follows it.
+INTERVIEWER_PROMPT = (
+    "You are an expert interviewer. Conduct a professional mock interview. Ask one question at a time. "
+    "Wait for the user's response before asking the next one. Do not overwhelm the user. "
+    "If the user's answer is brief or lacks detail, ask a follow-up question. "
+    "If the user goes off-topic, gently bring them back to the interview. "
+    "You can end the interview if the user asks to stop or once you have asked the number of questions given below."
+)
+
+# History entries are never modified in place, so system messages can be shared
+# between agents. This keeps the conversation prefix byte-identical across turns and
+# sessions, which lets providers reuse their prompt cache for it.
+ROLE_SELECTION_MESSAGE = {"role": "system", "content": ROLE_SELECTION_PROMPT}
+
+@functools.lru_cache(maxsize=128)
+def _interview_system_message(role: str, max_questions: int) -> Dict[str, str]:
+    return {"role": "system", "content": f"{INTERVIEWER_PROMPT}\n\nThe position is {role}. Ask at most {max_questions} questions."}
+
+# Phrases that end the interview, matched case-insensitively as whole words in a single scan
+# (so "I finished my degree" is an answer, not a request to stop)
+_EXIT_RE = re.compile(r"\b(?:end interview|stop interview|give me feedback|finish)\b", re.IGNORECASE)
+
+# Marker the LLM uses to confirm the role, capturing the role name on the same line
+_ROLE_RE = re.compile(r"Role Confirmed:\s*([^\n\r]+)")
+
+WRAP_UP_NOTE = {
+    "role": "user",
+    "content": "[Meta: The user has answered several questions. Please suggest concluding the interview and moving to the feedback stage, or ask one final challenging question.]"
+}
 
 class InterviewStage(Enum):
     ROLE_SELECTION = auto()
@@ -9,94 +58,201 @@ class InterviewStage(Enum):
     FINISHED = auto()
 
 class InterviewAgent:
-    def __init__(self, llm_client: LLMClient):
+    # One agent lives per user session; slots keep each instance small
+    __slots__ = ("llm_client", "history", "transcript", "stage", "role", "question_count", "max_questions",
+                 "context_token_budget", "async_feedback", "feedback_batch_id")
+
+    def __init__(self, llm_client: LLMClient) -> None:
         self.llm_client = llm_client
         self.history: List[Dict[str, str]] = []
+        # Immutable copy of the finished conversation, shareable without defensive copies
+        self.transcript: Optional[Tuple[Dict[str, str], ...]] = None
         self.stage = InterviewStage.ROLE_SELECTION
         self.role: Optional[str] = None
         self.question_count = 0
         self.max_questions = 5  # Default max questions before suggesting feedback
+        self.context_token_budget = 2000  # Prompt tokens sent per regular turn
+        self.async_feedback = False  # Queue feedback on the Batch API instead of waiting for it
+        self.feedback_batch_id: Optional[str] = None
 
     def start(self, role: Optional[str] = None) -> str:
         """Initializes the conversation. If role is provided, skips selection."""
+        self.transcript = None
         if role:
-            self.role = role
+            # Roles repeat across sessions; interning shares one string per role
+            self.role = sys.intern(role)
             self.stage = InterviewStage.INTERVIEW
-            self.history = [
-                {"role": "system", "content": f"You are an expert interviewer for a {self.role} position. Conduct a professional mock interview. Ask one question at a time. Wait for the user's response before asking the next one. Do not overwhelm the user. If the user's answer is brief or lacks detail, ask a follow-up question. If the user goes off-topic, gently bring them back to the interview. You can end the interview if the user asks to stop or if you have asked {self.max_questions} questions."}
-            ]
+            self.history = [self._interview_system_message()]
             greeting = f"Hello! I will be your interviewer for the {self.role} position today.\n\nLet's get started. Tell me a little bit about yourself and why you are interested in this role."
             self.history.append({"role": "assistant", "content": greeting})
             return greeting
         else:
-            self.history = [
-                {"role": "system", "content": "You are a helpful assistant designed to help users prepare for job interviews. Your goal is to facilitate a mock interview practice session."}
-            ]
+            self.history = [ROLE_SELECTION_MESSAGE]
             greeting = "Hello! I'm your Interview Practice Partner. I can help you prepare for job interviews by conducting mock interviews and providing feedback.\n\nTo get started, please tell me what job role you would like to practice for (e.g., Software Engineer, Sales Associate, Retail Manager)."
             self.history.append({"role": "assistant", "content": greeting})
             return greeting
 
+    def _interview_system_message(self) -> Dict[str, str]:
+        """System message for the interview stage, shared by every interview for the same role."""
+        return _interview_system_message(self.role, self.max_questions)
+
+    def _context_window(self, k: int = 8, extra: Tuple[Dict[str, str], ...] = ()) -> List[Dict[str, str]]:
+        """
+        Returns the messages to send for a regular turn: the system prompt plus the
+        most recent messages, at most k exchanges and within context_token_budget,
+        followed by any extra messages. The full history is kept for feedback generation.
+
+        Once the history no longer fits, the oldest turns are dropped k messages at a
+        time rather than one per turn, so the window keeps the same start (and the
+        provider's prompt cache keeps matching its prefix) for several turns.
+        """
+        history = self.history
+        system = history[0]
+        budget = self.context_token_budget - count_tokens([system, *extra])
+
+        # Walk back from the end so only the window is visited, not the whole history.
+        # The latest message is always kept, even if it alone exceeds the budget.
+        start, kept = len(history), 0
+        for i in range(len(history) - 1, 0, -1):
+            if history[i]['role'] == "system":
+                continue
+            if kept == 2 * k:
+                break
+            budget -= count_tokens([history[i]])
+            if budget < 0 and kept:
+                break
+            start, kept = i, kept + 1
+        else:
+            start = 1
+
+        if start > 1:
+            # Trimmed: move the start to the next multiple of k, never past the latest message
+            start = min(-(-start // k) * k, len(history) - 1)
+        return [system, *(m for m in history[start:] if m['role'] != "system"), *extra]
+
+    def _prompt_cache_key(self) -> str:
+        return f"interview:{self.role}" if self.role else "role_selection"
+
     def process_input(self, user_input: str) -> str:
         """Processes user input and returns the agent's response."""
+        return self._run(self._turn(user_input))
+
+    async def aprocess_input(self, user_input: str) -> str:
+        """Async variant of process_input that awaits the LLM without blocking the event loop."""
+        return await self._arun(self._turn(user_input))
+
+    def process_inputs(self, inputs: List[str]) -> List[str]:
+        """
+        Runs a scripted sequence of answers and returns the replies in order.
+        Turns run one after another: each reply depends on the history (and stage)
+        left by the previous turn, so they cannot be batched into one request.
+        """
+        return [self.process_input(user_input) for user_input in inputs]
+
+    async def aprocess_inputs(self, inputs: List[str]) -> List[str]:
+        """Async variant of process_inputs."""
+        return [await self.aprocess_input(user_input) for user_input in inputs]
+
+    def stream_input(self, user_input: str) -> Iterator[str]:
+        """
+        Streaming variant of process_input. Yields the reply in chunks as the LLM
+        generates it; replies that need post-processing (role selection) are yielded whole.
+        """
+        turn = self._turn(user_input)
+        streamed = False
+        try:
+            messages, options, verbatim = next(turn)
+            while True:
+                if verbatim:
+                    chunks = []
+                    for chunk in self.llm_client.stream_response(messages, **options):
+                        chunks.append(chunk)
+                        yield chunk
+                    streamed = True
+                    response = "".join(chunks)
+                else:
+                    response = self.llm_client.get_response(messages, **options)
+                messages, options, verbatim = turn.send(response)
+        except StopIteration as done:
+            if not streamed:
+                yield done.value
+
+    def _run(self, turn: Turn) -> str:
+        """Drives a turn, answering its LLM requests with blocking calls."""
+        try:
+            messages, options, _ = next(turn)
+            while True:
+                messages, options, _ = turn.send(self.llm_client.get_response(messages, **options))
+        except StopIteration as done:
+            return done.value
+
+    async def _arun(self, turn: Turn) -> str:
+        """Drives a turn, answering its LLM requests with awaited calls."""
+        try:
+            messages, options, _ = next(turn)
+            while True:
+                messages, options, _ = turn.send(await self.llm_client.aget_response(messages, **options))
+        except StopIteration as done:
+            return done.value
+
+    def _turn(self, user_input: str) -> Turn:
+        if self.stage is InterviewStage.FINISHED:
+            # Nothing more is added once the interview is over
+            return "The interview session has finished. Please restart the application to practice again."
+
         self.history.append({"role": "user", "content": user_input})
 
-        if self.stage == InterviewStage.ROLE_SELECTION:
-            return self._handle_role_selection(user_input)
-        elif self.stage == InterviewStage.INTERVIEW:
-            return self._handle_interview(user_input)
-        elif self.stage == InterviewStage.FEEDBACK:
+        # Enum members are singletons, so identity checks are the cheapest comparison
+        stage = self.stage
+        if stage is InterviewStage.ROLE_SELECTION:
+            return (yield from self._handle_role_selection(user_input))
+        elif stage is InterviewStage.INTERVIEW:
+            return (yield from self._handle_interview(user_input))
+        elif stage is InterviewStage.FEEDBACK:
             # If we are already in feedback mode, usually we just end or answer questions about feedback.
             # But for now, let's just continue conversation if they ask something, or close.
-             return self._generate_response()
-        else:
-            return "The interview session has finished. Please restart the application to practice again."
+             return (yield from self._generate_response())
 
-    def _generate_response(self) -> str:
+    def _generate_response(self) -> Turn:
         """Generates a generic response based on history."""
-        response = self.llm_client.get_response(self.history)
+        response = yield self._context_window(), {}, True
         self.history.append({"role": "assistant", "content": response})
         return response
 
-    def _handle_role_selection(self, user_input: str) -> str:
+    def _handle_role_selection(self, user_input: str) -> Turn:
         # We rely on the LLM to confirm the role or ask for clarification.
         # However, we want to transition to INTERVIEW stage if a role is clearly identified.
         # Let's ask the LLM to extract the role or confirm it.
 
-        # Update system prompt for role selection context
-        messages = self.history.copy()
-        messages.append({
-            "role": "system",
-            "content": "The user has provided input for the role they want to practice. If they specified a valid role, acknowledge it, set the context that you are now the interviewer for that role, and ask the first interview question. If the input is unclear, ask for clarification. Start your response with 'Role Confirmed: [Role Name]' if a role is found, otherwise just ask for clarification."
-        })
-
-        response = self.llm_client.get_response(messages)
-
-        if "Role Confirmed:" in response:
-            # Extract role and transition
-            parts = response.split("Role Confirmed:")
-            # Take the part after the key, split by newline to handle multiline responses,
-            # and strip whitespace to get just the role name.
-            role_part = parts[1].strip()
-            if "\n" in role_part:
-                self.role = role_part.split("\n")[0].strip()
-            else:
-                self.role = role_part
-
-            # Clean up the response to show to the user (remove the internal flag if we want, or keep it)
-            # Let's keep the response but maybe clean the flag if it looks robotic.
-            # Actually, let's instruct LLM to just start.
+        # The role-selection instructions live in the system prompt set by start(),
+        # so the history is sent as-is and its prefix stays stable between turns.
+        # A low temperature keeps the role extraction deterministic (and cacheable),
+        # and since role selection is stateless, near-duplicate inputs ("sales",
+        # "sales rep") can share a cached confirmation keyed on the user's message alone.
+        response = yield self.history, {
+            "temperature": 0.2,
+            "prompt_cache_key": self._prompt_cache_key(),
+            "semantic_key": user_input,
+        }, False
+
+        match = _ROLE_RE.search(response)
+        if match:
+            # Extract role and transition. The role is the rest of the marker's line;
+            # anything after that line is the model's first question.
+            self.role = sys.intern(match.group(1).strip())
+            first_question = response[match.end():]
 
             self.stage = InterviewStage.INTERVIEW
 
             # Re-orient the system prompt for the interview
-            self.history = [
-                {"role": "system", "content": f"You are an expert interviewer for a {self.role} position. Conduct a professional mock interview. Ask one question at a time. Wait for the user's response before asking the next one. Do not overwhelm the user. If the user's answer is brief or lacks detail, ask a follow-up question. If the user goes off-topic, gently bring them back to the interview. You can end the interview if the user asks to stop or if you have asked {self.max_questions} questions."}
-            ]
-            # We need to generate the first question now.
-            # The previous response might have been "Role Confirmed: Engineer. Okay let's start..."
-            # Let's just generate a fresh start message.
-
-            start_message = f"Great! I will act as the interviewer for the {self.role} position. Let's begin.\n\nTell me a little bit about yourself and why you are interested in this role."
+            self.history = [self._interview_system_message()]
+
+            # The same completion carries the role-tailored first question, so use it
+            # as-is instead of spending another round-trip. Fall back to a generic
+            # opener if the model only confirmed the role.
+            start_message = first_question.strip()
+            if not start_message:
+                start_message = f"Great! I will act as the interviewer for the {self.role} position. Let's begin.\n\nTell me a little bit about yourself and why you are interested in this role."
             self.history.append({"role": "assistant", "content": start_message})
             return start_message
 
@@ -105,39 +261,76 @@ class InterviewAgent:
             self.history.append({"role": "assistant", "content": response})
             return response
 
-    def _handle_interview(self, user_input: str) -> str:
+    def _handle_interview(self, user_input: str) -> Turn:
         # Check for exit commands
-        if any(cmd in user_input.lower() for cmd in ["end interview", "stop interview", "give me feedback", "finish"]):
-            return self.end_interview()
+        if _EXIT_RE.search(user_input):
+            return (yield from self._end_interview())
 
         self.question_count += 1
 
         # If we reached max questions, suggest ending
         if self.question_count > self.max_questions:
-             # Add a system hint to wrap up
-             messages = self.history.copy()
-             messages.append({
-                 "role": "system",
-                 "content": "The user has answered several questions. Suggest concluding the interview and moving to the feedback stage, or ask one final challenging question."
-             })
+             # Add the wrap-up hint as a trailing note rather than a new system
+             # message, so the cached prompt prefix of previous turns is untouched.
+             messages = self._context_window(extra=(WRAP_UP_NOTE,))
         else:
-             messages = self.history
+             messages = self._context_window()
 
-        response = self.llm_client.get_response(messages)
+        response = yield messages, {"prompt_cache_key": self._prompt_cache_key()}, True
         self.history.append({"role": "assistant", "content": response})
         return response
 
     def end_interview(self) -> str:
         """Ends the interview and provides feedback."""
+        return self._run(self._end_interview())
+
+    def _end_interview(self) -> Turn:
         self.stage = InterviewStage.FEEDBACK
 
         feedback_prompt = "The interview is now over. Please provide detailed feedback on the user's performance based on the conversation history. Assess their communication skills, technical knowledge (if applicable), and relevance to the role. Be constructive and highlight both strengths and areas for improvement. Format the output clearly."
 
         self.history.append({"role": "system", "content": feedback_prompt})
 
-        response = self.llm_client.get_response(self.history)
+        if self.async_feedback:
+            # Feedback is not time-critical, so it can go through the cheaper Batch API.
+            # If the batch can't be submitted, fall through to a synchronous request.
+            self.feedback_batch_id = self.llm_client.submit_batch_feedback(self.history)
+            if self.feedback_batch_id:
+                self._finish()
+                return f"Thanks! Your detailed feedback is being prepared and will appear here once it is ready. (id={self.feedback_batch_id})"
+
+        # Feedback needs the whole conversation, not just the recent window
+        response = yield self.history, {}, True
         self.history.append({"role": "assistant", "content": response})
 
-        # Transition to FINISHED so the loop in main.py knows to exit (or prompt for exit)
-        self.stage = InterviewStage.FINISHED
+        self._finish()
         return response
+
+    def _finish(self) -> None:
+        # Transition to FINISHED so the app stops taking answers and shows the feedback controls.
+        # The conversation is complete, so freeze it: consumers can share it without copying.
+        self.stage = InterviewStage.FINISHED
+        self.transcript = tuple(self.history)
+
+    def collect_feedback(self) -> Optional[str]:
+        """
+        Checks on feedback queued with async_feedback. Returns the feedback once it is
+        ready (and adds it to the history), or None while it is still pending.
+        """
+        if not self.feedback_batch_id:
+            return None
+
+        try:
+            feedback = self.llm_client.get_batch_feedback(self.feedback_batch_id)
+        except RuntimeError as e:
+            # The batch failed or expired, so generate the feedback directly instead
+            print(f"Batch feedback failed: {e}. Generating it directly...")
+            feedback = self.llm_client.get_response(self.history)
+
+        if feedback is None:
+            return None
+
+        self.history.append({"role": "assistant", "content": feedback})
+        self.transcript = tuple(self.history)
+        self.feedback_batch_id = None
+        return feedback
@@ -1,13 +1,23 @@
 import streamlit as st
+import asyncio
 import os
 import warnings
+from typing import Dict, List, Optional, cast
 # Suppress Google API warning about Python 3.10
 warnings.filterwarnings("ignore", category=FutureWarning, module="google.api_core")
 
 from llm_client import LLMClient
 from agent import InterviewAgent, InterviewStage
 
-def initialize_session_state():
+@st.cache_resource
+def get_llm_client(api_key: Optional[str], mock: bool) -> LLMClient:
+    """
+    One LLMClient per key/mode for the whole server, shared by all sessions.
+    It is built once, so its OpenAI connection is opened ahead of the first request.
+    """
+    return LLMClient(api_key=api_key, mock=mock, warmup=True)
+
+def initialize_session_state() -> None:
     if "agent" not in st.session_state:
         # Check API Keys
         api_key = os.getenv("OPENAI_API_KEY")
@@ -26,54 +36,117 @@ def initialize_session_state():
              else:
                  st.sidebar.info("Using OpenAI.")
 
-        client = LLMClient(api_key=api_key, mock=mock_mode)
+        client = get_llm_client(api_key, mock_mode)
         st.session_state.client = client # Store client separately for audio functions
         st.session_state.agent = InterviewAgent(client)
         st.session_state.started = False
         st.session_state.last_audio_response = None
-
-def display_chat_history():
+        st.session_state.last_tts_key = None
+
+def visible_history(agent: InterviewAgent) -> List[Dict[str, str]]:
+    """
+    Returns the agent's non-system messages. The filtered list is kept in session
+    state and only extended with messages added since the last rerun; it is rebuilt
+    when the agent replaces its history (e.g. after role confirmation).
+    """
+    cache = st.session_state.get("visible_history")
+    if cache is None or cache["source"] is not agent.history or cache["scanned"] > len(agent.history):
+        cache = {"source": agent.history, "scanned": 0, "messages": []}
+        st.session_state.visible_history = cache
+
+    new_messages = agent.history[cache["scanned"]:]
+    cache["messages"].extend(m for m in new_messages if m["role"] != "system")
+    cache["scanned"] = len(agent.history)
+    return cache["messages"]
+
+def display_chat_history() -> None:
     if "agent" in st.session_state:
-        for message in st.session_state.agent.history:
-            if message["role"] == "system":
-                continue
+        # Streamlit re-emits every element on each rerun, so all messages are drawn again;
+        # only the filtering work is incremental.
+        for message in visible_history(st.session_state.agent):
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
 
-def process_input(prompt, agent, client, mode):
+def show_fallback_warnings(response: str, client: LLMClient) -> None:
+    # Check if response indicates fallback
+    if "Quota exceeded" in response or "mock transcription" in response:
+        st.toast("⚠️ API Quota exceeded. Switched to Mock Mode.", icon="⚠️")
+
+    # Check specifically for Gemini Error
+    if hasattr(client, 'last_gemini_error') and client.last_gemini_error:
+        st.error(f"⚠️ {client.last_gemini_error} Please check your .env file.")
+
+def process_input(prompt: str, agent: InterviewAgent, client: LLMClient) -> None:
     # Display user message
     with st.chat_message("user"):
         st.markdown(prompt)
 
-    # Get response from agent
-    with st.spinner("Thinking..."):
-        response = agent.process_input(prompt)
+    # Display assistant message, streamed as it is generated
+    with st.chat_message("assistant"):
+        # All chunks are text, so write_stream returns the joined string
+        response = cast(str, st.write_stream(agent.stream_input(prompt)))
+        show_fallback_warnings(response, client)
+
+    # The finished state is handled in main(): buttons rendered here would be
+    # wiped by the rerun that follows.
+
+def process_voice_input(audio_bytes: bytes, agent: InterviewAgent, client: LLMClient) -> Optional[str]:
+    """Handles a recorded answer end to end. Returns the transcription, or None if it failed."""
+    return asyncio.run(_process_voice_input(audio_bytes, agent, client))
 
-        # Check if response indicates fallback
-        if "Quota exceeded" in response or "mock transcription" in response:
-            st.toast("⚠️ API Quota exceeded. Switched to Mock Mode.", icon="⚠️")
+async def _process_voice_input(audio_bytes: bytes, agent: InterviewAgent, client: LLMClient) -> Optional[str]:
+    # Every call runs on a fresh event loop; close its connections before the loop ends
+    try:
+        return await _voice_turn(audio_bytes, agent, client)
+    finally:
+        await client.aclose()
 
-        # Check specifically for Gemini Error
-        if hasattr(client, 'last_gemini_error') and client.last_gemini_error:
-            st.error(f"⚠️ {client.last_gemini_error} Please check your .env file.")
+async def _voice_turn(audio_bytes: bytes, agent: InterviewAgent, client: LLMClient) -> Optional[str]:
+    with st.spinner("Transcribing..."):
+        # Warm up the connection used for the reply while Whisper is still running
+        transcription, _ = await asyncio.gather(client.atranscribe_audio(audio_bytes), client.awarmup())
+
+    if not transcription:
+        return None
+
+    # Display user message
+    with st.chat_message("user"):
+        st.markdown(transcription)
 
     # Display assistant message
     with st.chat_message("assistant"):
+        with st.spinner("Thinking..."):
+            response = await agent.aprocess_input(transcription)
+
+        # Start audio synthesis before rendering so both overlap (skipped if this reply
+        # was already synthesized). Yielding once lets the task hand the work to its thread.
+        tts_key = client.tts_cache_key(response)
+        tts_task = None
+        if st.session_state.get("last_tts_key") != tts_key:
+            tts_task = asyncio.create_task(client.atext_to_speech(response))
+            await asyncio.sleep(0)
+
         st.markdown(response)
+        show_fallback_warnings(response, client)
 
-        # Generate audio if in Voice mode
-        if mode == "Voice":
+        if tts_task:
              with st.spinner("Generating audio..."):
-                 audio_path = client.text_to_speech(response)
+                 audio_path = await tts_task
                  if audio_path:
                      st.session_state.last_audio_response = audio_path
+                     st.session_state.last_tts_key = tts_key
+
+    return transcription
 
-    # Check if finished
-    # We don't render buttons here because this runs inside the processing loop
-    # and will be wiped on rerun. We handle the finished state in the main loop.
-    pass
+def reset_interview() -> None:
+    """Drops the current agent so a fresh one is built on the next run."""
+    del st.session_state.agent
+    st.session_state.started = False
+    st.session_state.last_audio_response = None
+    st.session_state.last_tts_key = None
+    st.rerun()
 
-def main():
+def main() -> None:
     st.set_page_config(page_title="Interview Practice Partner", page_icon="👔")
     st.title("Interview Practice Partner 👔")
 
@@ -99,20 +172,23 @@ def main():
             role = selected_role
 
         if not st.session_state.started:
+            deferred_feedback = st.checkbox(
+                "Deferred feedback",
+                help="Prepare the final feedback with the OpenAI Batch API: half the cost, but it can take a while to arrive."
+            )
             if st.button("Start Interview"):
                 if role:
+                    st.session_state.agent.async_feedback = deferred_feedback
                     st.session_state.agent.start(role=role)
                     st.session_state.started = True
                     st.session_state.last_audio_response = None
+                    st.session_state.last_tts_key = None
                     st.rerun()
                 else:
                     st.error("Please select or enter a role.")
         else:
             if st.button("Reset Interview"):
-                del st.session_state.agent
-                st.session_state.started = False
-                st.session_state.last_audio_response = None
-                st.rerun()
+                reset_interview()
 
     agent = st.session_state.agent
     client = st.session_state.client
@@ -129,18 +205,23 @@ def main():
 
     # Check if finished to display feedback controls outside the processing loop
     if agent.stage == InterviewStage.FINISHED:
-         st.success("Interview Finished! Review the feedback above.")
+         if agent.feedback_batch_id:
+             # Deferred feedback: poll the batch on each run until it is ready
+             if agent.collect_feedback() is not None:
+                 st.rerun()
+             st.info("Your feedback is still being prepared. Check back later.")
+             if st.button("Check for feedback"):
+                 st.rerun()
+         else:
+             st.success("Interview Finished! Review the feedback above.")
          if st.button("Restart Interview", key="restart_main"):
-             del st.session_state.agent
-             st.session_state.started = False
-             st.session_state.last_audio_response = None
-             st.rerun()
+             reset_interview()
          return # Stop input handling if finished
 
     # Input Handling
     if mode == "Chat":
         if prompt := st.chat_input("Type your response here..."):
-            process_input(prompt, agent, client, mode)
+            process_input(prompt, agent, client)
             # Force rerun to update UI and play audio if any
             st.rerun()
 
@@ -152,11 +233,9 @@ def main():
             current_audio_bytes = audio_value.getvalue()
 
             if st.session_state.get("processed_audio") != current_audio_bytes:
-                with st.spinner("Transcribing..."):
-                     transcription = client.transcribe_audio(audio_value)
+                transcription = process_voice_input(current_audio_bytes, agent, client)
 
                 if transcription:
-                    process_input(transcription, agent, client, mode)
                     st.session_state.processed_audio = current_audio_bytes
                     st.rerun() # Rerun to update history display cleanly and play audio
                 else:
@@ -0,0 +1,84 @@
+from typing import TYPE_CHECKING, List, Dict, Optional
+import json
+import time
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# Terminal states in which a batch will never produce output
+FAILED_STATUSES = ("failed", "expired", "cancelled")
+
+def submit_batch(client: "OpenAI", message_lists: List[List[Dict[str, str]]], model: str = "gpt-4o") -> str:
+    """
+    Queues one chat completion per message list on the OpenAI Batch API (half the
+    price of regular requests, completed within 24h). Request i gets custom_id "i".
+    Returns the batch id; API errors propagate to the caller.
+    """
+    lines = [
+        json.dumps({
+            "custom_id": str(i),
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": model, "messages": messages},
+        })
+        for i, messages in enumerate(message_lists)
+    ]
+    batch_file = client.files.create(
+        file=("batch.jsonl", "\n".join(lines).encode()),
+        purpose="batch"
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    return batch.id
+
+def batch_results(client: "OpenAI", batch_id: str) -> Optional[Dict[str, Optional[str]]]:
+    """
+    Returns {custom_id: response text} for a completed batch, or None while it is
+    still running. Requests that failed individually map to None.
+    Raises RuntimeError if the batch itself did not complete.
+    """
+    batch = client.batches.retrieve(batch_id)
+    if batch.status in FAILED_STATUSES:
+        raise RuntimeError(f"Batch {batch_id} {batch.status}")
+    if batch.status != "completed":
+        return None
+    if not batch.output_file_id:
+        raise RuntimeError(f"Batch {batch_id} completed without output")
+
+    output = client.files.content(batch.output_file_id).text
+    return parse_results(output)
+
+def parse_results(output: str) -> Dict[str, Optional[str]]:
+    """Parses a batch output JSONL file into {custom_id: response text}."""
+    results = {}
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response")
+        if result.get("error") or not response or response.get("status_code") != 200:
+            results[result["custom_id"]] = None
+        else:
+            results[result["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return results
+
+def wait_for_batch(client: "OpenAI", batch_id: str, poll_interval: float = 5.0, max_interval: float = 300.0,
+                   timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+    """
+    Blocks until the batch completes and returns its results. The delay between
+    polls doubles from poll_interval up to max_interval.
+    Raises TimeoutError if timeout seconds pass first.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    interval = poll_interval
+    while True:
+        results = batch_results(client, batch_id)
+        if results is not None:
+            return results
+        if deadline is not None and time.monotonic() + interval > deadline:
+            raise TimeoutError(f"Batch {batch_id} still running after {timeout}s")
+        time.sleep(interval)
+        interval = min(interval * 2, max_interval)
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from typing import Any, Optional, Protocol, Tuple
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+
+# Stored entries are (expires_at, response); expires_at is None for entries that never expire
+Entry = Tuple[Optional[float], str]
+
+class CacheBackend(Protocol):
+    """Storage used by LLMCache. Backends only store entries; expiry is handled by LLMCache."""
+    def get(self, key: str) -> Optional[Entry]: ...
+    def set(self, key: str, entry: Entry) -> None: ...
+    def delete(self, key: str) -> None: ...
+    def __len__(self) -> int: ...
+
+class MemoryBackend:
+    """In-process LRU dict, bounded to max_entries. Thread-safe."""
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Entry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Entry]:
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+class FileBackend:
+    """
+    One JSON file per entry in a directory, so cached responses survive restarts
+    and can be shared by several processes on the same machine.
+    """
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def __len__(self) -> int:
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Entry]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                expires_at, response = json.load(f)
+            return expires_at, response
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key: str, entry: Entry) -> None:
+        # Write to a private temp file first so readers never see a partial entry.
+        # Caching is best-effort: a failed write (disk full, permissions) is dropped.
+        tmp_path = os.path.join(self.directory, f"{key}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(list(entry), f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+class LLMCache:
+    """
+    Exact-match cache of LLM responses on top of a pluggable backend.
+    ttl is in seconds; None keeps entries until the backend evicts them.
+    """
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = None) -> None:
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+        self._stats_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.backend)
+
+    @staticmethod
+    def make_key(model: str, messages: Any, temperature: float) -> str:
+        # Compact, non-ASCII-escaping encoding: the payload only feeds the hash
+        payload = json.dumps({"model": model, "messages": messages, "temperature": temperature},
+                             sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.backend.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at is None or expires_at > time.time():
+                self._count("hits")
+                return response
+            self.backend.delete(key)
+        self._count("misses")
+        return None
+
+    def set(self, key: str, response: str) -> None:
+        expires_at = time.time() + self.ttl if self.ttl is not None else None
+        self.backend.set(key, (expires_at, response))
+
@@ -1,19 +1,297 @@
 import os
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-from openai import OpenAI
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, BinaryIO, List, Dict, Any, Awaitable, Callable, Iterator, Optional, Tuple, Union
 from dotenv import load_dotenv
-from gtts import gTTS
+from semantic_cache import SemanticCache
+from llm_cache import FileBackend, LLMCache, MemoryBackend
+from rate_limit import TokenBucket
+import batch
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import io
+import mmap
+import re
+import numpy as np
 import tempfile
+import threading
 import pathlib
+import uuid
+from types import ModuleType
 
-load_dotenv()
+__all__ = ["LLMClient", "count_tokens", "GEMINI_MODELS", "TTS_CACHE_DIR", "TRANSCRIPTION_CACHE_DIR"]
+
+if TYPE_CHECKING:
+    import httpx
+    import tiktoken
+    from openai import OpenAI, AsyncOpenAI
+
+# Audio accepted by transcribe_audio: raw bytes, a file-like object or a path
+AudioInput = Union[bytes, bytearray, BinaryIO, str, "os.PathLike[str]"]
+
+# The provider SDKs are slow to import (openai pulls in pydantic, google.generativeai
+# pulls in grpc and protobuf), so they are imported on first use. Mock mode never loads them;
+# the same goes for httpx and tiktoken below.
+genai = None
+google_exceptions = None
+
+def _load_genai() -> bool:
+    """Imports google.generativeai on first use. Returns False if it is not installed."""
+    global genai, google_exceptions
+    if genai is None:
+        try:
+            import google.generativeai as genai_module
+            from google.api_core import exceptions as exceptions_module
+        except ImportError:
+            return False
+        genai, google_exceptions = genai_module, exceptions_module
+    return True
+
+@functools.lru_cache(maxsize=1)
+def _load_env() -> bool:
+    """
+    Loads .env once per process. There is no os.path.exists(".env") shortcut:
+    load_dotenv also finds a .env in parent directories (e.g. when run from src/).
+    """
+    load_dotenv()
+    return True
+
+_load_env()
+
+@functools.lru_cache(maxsize=1)
+def _encoding() -> Optional["tiktoken.Encoding"]:
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception as e:
+        print(f"Failed to load tiktoken encoding: {e}")
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def _content_tokens(text: str) -> int:
+    """Token count of a message body, memoized so history entries are encoded once."""
+    encoding = _encoding()
+    if encoding is None:
+        # Rough estimate (~4 characters per token) when tiktoken is unavailable
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def count_tokens(messages: List[Dict[str, str]]) -> int:
+    """Approximate prompt tokens for a message list (content plus per-message overhead)."""
+    return sum(_content_tokens(m['content']) + 4 for m in messages)
+
+@functools.lru_cache(maxsize=1)
+def _load_httpx() -> Optional[ModuleType]:
+    """Imports httpx on first use. Returns None if it is not installed."""
+    try:
+        import httpx
+    except ImportError:
+        return None
+    return httpx
+
+def _http_client_options() -> Dict[str, Any]:
+    """
+    Connection settings shared by every OpenAI endpoint (chat, embeddings, TTS, Whisper).
+    All of them hit api.openai.com, so keep-alive connections skip repeated TLS
+    handshakes, and HTTP/2 (when the h2 package is installed) multiplexes
+    concurrent requests over one socket.
+    """
+    return {
+        "http2": importlib.util.find_spec("h2") is not None,
+        # Fail fast when the API is unreachable, but give long completions time to finish
+        "timeout": _load_httpx().Timeout(30.0, connect=5.0),
+        "limits": _load_httpx().Limits(max_keepalive_connections=20, max_connections=100),
+    }
+
+@functools.lru_cache(maxsize=1)
+def _shared_http_client() -> Optional["httpx.Client"]:
+    httpx = _load_httpx()
+    if httpx is None:
+        return None
+    return httpx.Client(**_http_client_options())
+
+@functools.lru_cache(maxsize=4)
+def _make_openai(api_key: str) -> "OpenAI":
+    """Returns a shared OpenAI client per key, so its HTTP connection pool is reused."""
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, http_client=_shared_http_client())
+
+# Per-thread {api_key: (event loop, AsyncOpenAI)}, see _make_async_openai
+_async_clients = threading.local()
+
+def _make_async_openai(api_key: str) -> "AsyncOpenAI":
+    """
+    Returns an AsyncOpenAI client for the key, bound to the running event loop.
+    Its connection pool cannot be shared across loops, and Streamlit starts a
+    fresh loop for every asyncio.run() call, in whichever session thread is
+    running, so clients are kept per thread and replaced when the loop changes.
+    """
+    loop = asyncio.get_running_loop()
+    clients = getattr(_async_clients, "by_key", None)
+    if clients is None:
+        clients = _async_clients.by_key = {}
+    entry = clients.get(api_key)
+    if entry is None or entry[0] is not loop:
+        from openai import AsyncOpenAI
+        httpx = _load_httpx()
+        http_client = httpx.AsyncClient(**_http_client_options()) if httpx else None
+        entry = clients[api_key] = (loop, AsyncOpenAI(api_key=api_key, http_client=http_client))
+    return entry[1]
+
+async def _aclose_async_openai() -> None:
+    """
+    Closes this thread's AsyncOpenAI clients bound to the running loop and forgets
+    them. Call it before the loop ends (e.g. at the end of asyncio.run()), since
+    their connections cannot be closed once the loop is gone.
+    """
+    loop = asyncio.get_running_loop()
+    clients = getattr(_async_clients, "by_key", {})
+    for api_key, (client_loop, client) in list(clients.items()):
+        if client_loop is loop:
+            del clients[api_key]
+            await client.close()
+
+# Tried in order until one answers
+GEMINI_MODELS = ('gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro')
+# Models that reject system_instruction; their system prompt goes in the first user turn
+GEMINI_NO_SYSTEM_INSTRUCTION = frozenset({'gemini-pro'})
+
+def _is_invalid_gemini_key(e: Exception) -> bool:
+    """True only if the Gemini key itself is unknown (a 400 with reason API_KEY_INVALID)."""
+    if google_exceptions is None:
+        return False
+    return isinstance(e, google_exceptions.InvalidArgument) and e.reason == "API_KEY_INVALID"
+
+def _is_gemini_auth_error(e: Exception) -> bool:
+    """
+    True if the request was refused for the key or project. Permission errors can be
+    model-, region- or project-specific, or temporary, so they only end the current
+    request; only an invalid key is permanent.
+    """
+    if google_exceptions is not None and isinstance(
+            e, (google_exceptions.Unauthenticated, google_exceptions.PermissionDenied)):
+        return True
+    return _is_invalid_gemini_key(e)
+
+@functools.lru_cache(maxsize=32)
+def _gemini_model(model_name: str, system_instruction: Optional[str] = None) -> "genai.GenerativeModel":
+    """
+    Returns a shared GenerativeModel per name and system instruction instead of
+    rebuilding it on every request. System prompts are fixed per interview stage and
+    role, so only a handful of combinations are live at a time.
+    """
+    return genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait after a rate-limit error: the server's retry-after, else exponential backoff."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return min(2 ** attempt, 60)
+
+def _split_on_sentence(text: str, first_max: int = 700, rest_max: int = 4000) -> List[str]:
+    """
+    Splits text into speech chunks at sentence ends (falling back to spaces).
+    The first chunk is kept short so its audio is ready quickly; later chunks stay
+    under the 4096-character limit of OpenAI TTS.
+    """
+    chunks = []
+    rest = text.strip()
+    limit = first_max
+    while len(rest) > limit:
+        window = rest[:limit]
+        cut = max(window.rfind(". "), window.rfind("! "), window.rfind("? "))
+        if cut != -1:
+            cut += 1  # Keep the punctuation with its sentence
+        else:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = limit
+        chunks.append(rest[:cut].strip())
+        rest = rest[cut:].strip()
+        limit = rest_max
+    if rest:
+        chunks.append(rest)
+    return chunks
+
+# Synthesized speech is kept across runs; the least recently used files are removed
+# once the directory grows past TTS_CACHE_MAX_BYTES
+TTS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "interview_practice", "tts")
+TTS_CACHE_MAX_BYTES = 100 * 1024 * 1024
+TRANSCRIPTION_CACHE_DIR = os.path.join(tempfile.gettempdir(), "whisper_cache")
+
+def _make_response_cache() -> LLMCache:
+    """
+    The chat response cache. In memory by default; setting LLM_CACHE_DIR keeps
+    responses on disk so they survive restarts (and repeated test runs), and
+    LLM_CACHE_TTL expires entries after that many seconds.
+    """
+    directory = os.getenv("LLM_CACHE_DIR")
+    backend = FileBackend(directory) if directory else MemoryBackend(max_entries=256)
+
+    ttl = None
+    if os.getenv("LLM_CACHE_TTL"):
+        try:
+            ttl = float(os.environ["LLM_CACHE_TTL"])
+        except ValueError:
+            print(f"Warning: ignoring invalid LLM_CACHE_TTL {os.environ['LLM_CACHE_TTL']!r}")
+    return LLMCache(backend, ttl=ttl)
+
+def _unique_tmp_path(path: str) -> str:
+    """
+    A private file name next to path, for writing before an atomic os.replace.
+    Built from a uuid rather than created by tempfile, so nothing touches the disk
+    until the caller writes.
+    """
+    return f"{path}.{uuid.uuid4().hex}.tmp"
+
+def _prune_cache_dir(directory: str, max_bytes: int) -> None:
+    """Deletes the least recently used files until the directory fits in max_bytes."""
+    entries = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+# Canned replies for mock mode, keyed by the regex group that selects them
+_MOCK_RE = re.compile(
+    r"\b(?:(?P<sales>sales)|(?P<engineer>engineer)|(?P<pm>product manager)|(?P<data>data scientist))\b",
+    re.IGNORECASE,
+)
+_MOCK_REPLIES = {
+    "sales": "Role Confirmed: Sales Representative\nExcellent choice. I will be interviewing you for a Sales position. Let's begin. \n\nCan you tell me about a time you had to sell a difficult product?",
+    "engineer": "Role Confirmed: Software Engineer\nExcellent choice. I will be interviewing you for a Software Engineer position. Let's begin. \n\nCan you describe a challenging technical problem you solved recently?",
+    "pm": "Role Confirmed: Product Manager\nExcellent choice. I will be interviewing you for a Product Manager position. Let's begin. \n\nHow do you decide what goes into the next release when stakeholders disagree?",
+    "data": "Role Confirmed: Data Scientist\nExcellent choice. I will be interviewing you for a Data Scientist position. Let's begin. \n\nCan you walk me through a model you built and how you evaluated it?",
+}
+
+@functools.lru_cache(maxsize=256)
+def _mock_reply(user_input: str) -> str:
+    """Canned reply for a normalized user message."""
+    hit = _MOCK_RE.search(user_input)
+    if hit:
+        return _MOCK_REPLIES[hit.lastgroup]
+    return "That's an interesting point. Could you elaborate on that? (Mock response)"
 
 class LLMClient:
-    def __init__(self, api_key: Optional[str] = None, mock: bool = False):
+    def __init__(self, api_key: Optional[str] = None, mock: bool = False, warmup: bool = False) -> None:
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         self.gemini_key = os.getenv("GEMINI_API_KEY")
         self.mock = mock
@@ -22,11 +300,14 @@ class LLMClient:
 
         # Configure OpenAI
         if not self.mock and self.api_key:
-            self.client = OpenAI(api_key=self.api_key)
+            self.client = _make_openai(self.api_key)
+            if warmup:
+                # Open the connection in the background while the user is still picking a role
+                threading.Thread(target=self.warmup, daemon=True).start()
 
         # Configure Gemini
         if self.gemini_key:
-            if genai:
+            if _load_genai():
                 try:
                     genai.configure(api_key=self.gemini_key)
                     self.gemini_configured = True
@@ -35,34 +316,81 @@ class LLMClient:
             else:
                  print("Warning: google-generativeai package not found. Install it to use Gemini.")
 
-        # Track last Gemini error for UI feedback
-        self.last_gemini_error = None
+        self.tts_voice = "alloy"
+
+        # Seconds to wait on OpenAI before also asking Gemini (async path only)
+        self.hedge_delay = 2.0
+
+        # Set once Gemini reports the key as invalid, for UI feedback. The key is shared
+        # by every session and will not become valid, so this is never cleared.
+        self.last_gemini_error: Optional[str] = None
+
+        # Exact-match cache of OpenAI chat responses. The app shares one client across
+        # all Streamlit sessions; both backends are thread-safe.
+        self.cache = _make_response_cache()
+
+        # Running totals of OpenAI prompt tokens and how many were served from the
+        # provider's prompt cache, to check that the conversation prefix stays stable
+        self.usage = {"prompt_tokens": 0, "cached_tokens": 0}
+        self._usage_lock = threading.Lock()
+
+        # Embedding-based cache for near-duplicate inputs (e.g. "sales" vs "sales rep")
+        self._semantic_cache = SemanticCache(threshold=0.92, max_entries=128)
+
+        # Running async requests by (event loop, cache key), see aget_response
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], "asyncio.Future[str]"] = {}
 
         if not self.api_key and not self.gemini_configured and not self.mock:
             print("Warning: No API Keys found. Switch to mock mode or provide key.")
             self.mock = True
 
-    def get_response(self, messages: List[Dict[str, str]], temperature: float = 0.7) -> str:
+    def get_response(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                     prompt_cache_key: Optional[str] = None,
+                     semantic_key: Optional[str] = None) -> str:
         """
         Get a response from the LLM (OpenAI -> Gemini -> Mock).
         messages: list of dicts with 'role' and 'content'
+        prompt_cache_key: optional hint that routes requests sharing a prompt prefix
+        to the same OpenAI prompt cache.
+        semantic_key: optional text to look up in the semantic cache instead of the
+        full message list. Only use it for stateless calls such as role selection.
         """
         if self.mock:
             return self._get_mock_response(messages)
 
         # Try OpenAI
         if self.client:
+            cache_key = self._response_cache_key(messages, temperature)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+            query_vector = self.embed(semantic_key) if semantic_key else None
+            if query_vector is not None:
+                cached = self._semantic_cache.lookup(query_vector)
+                if cached is not None:
+                    return cached
+
             try:
+                extra_body = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else None
                 response = self.client.chat.completions.create(
                     model="gpt-4o",
                     messages=messages,
                     temperature=temperature,
+                    extra_body=extra_body,
                 )
-                return response.choices[0].message.content
+                content = response.choices[0].message.content
             except Exception as e:
                 # If quota error or other critical error, try Gemini
                 print(f"OpenAI Error: {e}. Attempting fallback...")
-                pass # Proceed to Gemini fallback logic
+            else:
+                # Bookkeeping stays outside the try: it must never discard a good answer
+                self._record_usage(response.usage)
+                if cache_key is not None:
+                    self._cache_put(cache_key, content)
+                if query_vector is not None:
+                    self._semantic_cache.add(query_vector, content)
+                return content
 
         # Try Gemini
         if self.gemini_configured:
@@ -72,100 +400,504 @@ class LLMClient:
         print("All LLMs failed or not configured. Using Mock.")
         return self._get_mock_response(messages)
 
+    def stream_response(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                        prompt_cache_key: Optional[str] = None,
+                        semantic_key: Optional[str] = None) -> Iterator[str]:
+        """
+        Streaming variant of get_response that yields the reply in chunks.
+        Only OpenAI streams; cache hits and the Gemini/Mock fallbacks yield the whole reply at once.
+        """
+        if self.mock or not self.client:
+            yield self.get_response(messages, temperature, prompt_cache_key, semantic_key)
+            return
+
+        cache_key = self._response_cache_key(messages, temperature)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        try:
+            extra_body = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else None
+            stream = self.client.chat.completions.create(
+                model="gpt-4o",
+                messages=messages,
+                temperature=temperature,
+                extra_body=extra_body,
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                if not chunk.choices:
+                    # The final chunk carries only the usage
+                    self._record_usage(chunk.usage)
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+        except Exception as e:
+            print(f"OpenAI Streaming Error: {e}. Attempting fallback...")
+            if chunks:
+                # Part of the reply was already shown; keep it rather than repeat it.
+                return
+            if self.gemini_configured:
+                yield self._get_gemini_response(messages)
+            else:
+                yield self._get_mock_response(messages)
+            return
+
+        if cache_key is not None:
+            self._cache_put(cache_key, "".join(chunks))
+
+    async def aget_response(self, messages: List[Dict[str, str]], temperature: float = 0.7,
+                            prompt_cache_key: Optional[str] = None,
+                            semantic_key: Optional[str] = None) -> str:
+        """
+        Async variant of get_response. Instead of waiting for OpenAI to fail before
+        trying Gemini, Gemini is started as a hedge once OpenAI has been silent for
+        hedge_delay seconds; the first successful answer wins and the other request
+        is cancelled.
+        """
+        if self.mock:
+            return self._get_mock_response(messages)
+
+        cache_key = self._response_cache_key(messages, temperature) if self.client else None
+        if cache_key is None:
+            return await self._aget_response(messages, temperature, prompt_cache_key, semantic_key, None)
+
+        # Identical cacheable requests already in flight on this event loop share one call.
+        # Waiters are shielded so a cancelled caller does not cancel it for the others.
+        inflight_key = (asyncio.get_running_loop(), cache_key)
+        task = self._inflight.get(inflight_key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._aget_response(messages, temperature, prompt_cache_key, semantic_key, cache_key))
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(inflight_key, None))
+        return await asyncio.shield(task)
+
+    async def _aget_response(self, messages: List[Dict[str, str]], temperature: float,
+                             prompt_cache_key: Optional[str], semantic_key: Optional[str],
+                             cache_key: Optional[str]) -> str:
+        attempts = []
+        if self.client:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+            query_vector = await asyncio.to_thread(self.embed, semantic_key) if semantic_key else None
+            if query_vector is not None:
+                cached = self._semantic_cache.lookup(query_vector)
+                if cached is not None:
+                    return cached
+
+            attempts.append(lambda: self._aget_openai_response(messages, temperature, prompt_cache_key, cache_key, query_vector))
+
+        if self.gemini_configured:
+            attempts.append(lambda: self._aget_gemini_response(messages))
+
+        content = await self._first_success(attempts)
+        if content is not None:
+            return content
+
+        # Fallback to Mock
+        print("All LLMs failed or not configured. Using Mock.")
+        return self._get_mock_response(messages)
+
+    async def abatch(self, message_lists: List[List[Dict[str, str]]], **kwargs) -> List[str]:
+        """Runs several independent conversations concurrently; results keep the input order."""
+        return list(await asyncio.gather(*(self.aget_response(messages, **kwargs) for messages in message_lists)))
+
+    async def _first_success(self, attempts: List[Callable[[], Awaitable[Optional[str]]]]) -> Optional[str]:
+        """
+        Starts the attempts in order. The next one is launched as soon as every running
+        attempt has failed (returned None) or hedge_delay seconds pass without an answer.
+        Returns the first non-None result, cancelling whatever is still running.
+        """
+        pending = set()
+        try:
+            for i, attempt in enumerate(attempts):
+                pending.add(asyncio.create_task(attempt()))
+                timeout = self.hedge_delay if i < len(attempts) - 1 else None
+                while pending:
+                    done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        break  # Still waiting: hedge with the next provider
+                    for task in done:
+                        if task.result() is not None:
+                            return task.result()
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def parallel_map(self, message_lists: List[List[Dict[str, str]]], temperature: float = 0.7,
+                           max_concurrency: int = 10, rpm: int = 500, tpm: int = 90_000,
+                           max_retries: int = 5) -> List[str]:
+        """
+        Bulk variant of abatch for large workloads (evaluations, offline feedback).
+        At most max_concurrency requests are in flight, paced to stay under the
+        account's requests- and tokens-per-minute limits. Rate-limited requests are
+        retried after the delay the API asks for; requests that still fail fall back
+        to Gemini/Mock. Results keep the input order.
+        """
+        if self.mock or not self.client:
+            return await self.abatch(message_lists, temperature=temperature)
+
+        from openai import RateLimitError
+        semaphore = asyncio.Semaphore(max_concurrency)
+        request_bucket = TokenBucket(rpm)
+        token_bucket = TokenBucket(tpm)
+
+        async def run(messages: List[Dict[str, str]]) -> str:
+            cache_key = self._response_cache_key(messages, temperature)
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+
+            # Estimated once; retries reuse it
+            prompt_tokens = count_tokens(messages)
+            async with semaphore:
+                for attempt in range(max_retries + 1):
+                    await request_bucket.acquire()
+                    await token_bucket.acquire(prompt_tokens)
+                    try:
+                        content = await self._acomplete(messages, temperature)
+                    except RateLimitError as e:
+                        if attempt == max_retries:
+                            print(f"OpenAI Error: {e}. Giving up after {max_retries} retries.")
+                            break
+                        await asyncio.sleep(_retry_delay(e, attempt))
+                        continue
+                    except Exception as e:
+                        print(f"OpenAI Error: {e}. Attempting fallback...")
+                        break
+                    if cache_key is not None:
+                        self._cache_put(cache_key, content)
+                    return content
+
+            content = await self._aget_gemini_response(messages) if self.gemini_configured else None
+            return content if content is not None else self._get_mock_response(messages)
+
+        return list(await asyncio.gather(*(run(messages) for messages in message_lists)))
+
+    def parallel_map_sync(self, message_lists: List[List[Dict[str, str]]], **kwargs) -> List[str]:
+        """Blocking wrapper around parallel_map for scripts without an event loop."""
+        async def run() -> List[str]:
+            try:
+                return await self.parallel_map(message_lists, **kwargs)
+            finally:
+                await self.aclose()
+        return asyncio.run(run())
+
+    async def _acomplete(self, messages: List[Dict[str, str]], temperature: float,
+                         prompt_cache_key: Optional[str] = None) -> str:
+        """A single AsyncOpenAI chat completion. API errors propagate."""
+        extra_body = {"prompt_cache_key": prompt_cache_key} if prompt_cache_key else None
+        response = await self._async_client().chat.completions.create(
+            model="gpt-4o",
+            messages=messages,
+            temperature=temperature,
+            extra_body=extra_body,
+        )
+        self._record_usage(response.usage)
+        return response.choices[0].message.content
+
+    async def _aget_openai_response(self, messages: List[Dict[str, str]], temperature: float,
+                                    prompt_cache_key: Optional[str], cache_key: Optional[str],
+                                    query_vector: Optional[np.ndarray]) -> Optional[str]:
+        try:
+            content = await self._acomplete(messages, temperature, prompt_cache_key)
+        except Exception as e:
+            print(f"OpenAI Error: {e}. Attempting fallback...")
+            return None
+
+        if cache_key is not None:
+            self._cache_put(cache_key, content)
+        if query_vector is not None:
+            self._semantic_cache.add(query_vector, content)
+        return content
+
+    def _record_usage(self, usage: Any) -> None:
+        """Adds a completion's prompt token counts to self.usage."""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+        if not isinstance(prompt_tokens, int) or not isinstance(cached_tokens, int):
+            return
+        with self._usage_lock:
+            self.usage["prompt_tokens"] += prompt_tokens
+            self.usage["cached_tokens"] += cached_tokens
+
+    def _async_client(self) -> "AsyncOpenAI":
+        """Returns the AsyncOpenAI client for the running event loop."""
+        return _make_async_openai(self.api_key)
+
+    async def aclose(self) -> None:
+        """
+        Releases the async connections opened on the running event loop. Callers
+        that run a short-lived loop (asyncio.run) should await this before it ends.
+        """
+        await _aclose_async_openai()
+
+    def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embeds text with OpenAI. Returns None if embeddings are unavailable."""
+        if self.mock or not self.client:
+            return None
+        try:
+            response = self.client.embeddings.create(model="text-embedding-3-small", input=text)
+            return np.asarray(response.data[0].embedding, dtype=np.float32)
+        except Exception as e:
+            print(f"OpenAI Embedding Error: {e}")
+            return None
+
+    @staticmethod
+    def _is_cacheable(messages: List[Dict[str, str]], temperature: float) -> bool:
+        """Only near-deterministic calls are worth caching: low temperature,
+        or a trailing system instruction (e.g. the feedback request)."""
+        return temperature <= 0.2 or (bool(messages) and messages[-1]['role'] == "system")
+
+    def _response_cache_key(self, messages: List[Dict[str, str]], temperature: float) -> Optional[str]:
+        """Exact-cache key for the request, or None if it should not be cached."""
+        if not self._is_cacheable(messages, temperature):
+            return None
+        return self.cache.make_key("gpt-4o", messages, temperature)
+
+    def _cache_get(self, key: Optional[str]) -> Optional[str]:
+        return self.cache.get(key) if key is not None else None
+
+    def _cache_put(self, key: str, response: str) -> None:
+        self.cache.set(key, response)
+
     def _get_gemini_response(self, messages: List[Dict[str, str]]) -> str:
-        self.last_gemini_error = None
+        content = self._gemini_generate(messages)
+        return content if content is not None else self._get_mock_response(messages)
 
-        # Try primary model then fallback
-        models_to_try = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro']
+    def _gemini_generate(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """Tries each Gemini model in turn. Returns None if none of them answered."""
+        system_instruction, contents = self._gemini_contents(messages)
 
-        for model_name in models_to_try:
+        for model_name in GEMINI_MODELS:
             try:
-                model = genai.GenerativeModel(model_name)
-
-                # Construct a prompt from messages
-                prompt_text = ""
-                for msg in messages:
-                    role = msg['role']
-                    content = msg['content']
-                    if role == "system":
-                        prompt_text += f"System: {content}\n"
-                    elif role == "user":
-                        prompt_text += f"User: {content}\n"
-                    elif role == "assistant":
-                        prompt_text += f"Assistant: {content}\n"
-
-                prompt_text += "Assistant: "
-
-                response = model.generate_content(prompt_text)
+                if system_instruction is not None and model_name in GEMINI_NO_SYSTEM_INSTRUCTION:
+                    model = _gemini_model(model_name)
+                    response = model.generate_content(self._fold_system_instruction(system_instruction, contents))
+                else:
+                    model = _gemini_model(model_name, system_instruction)
+                    response = model.generate_content(contents)
                 return response.text
             except Exception as e:
-                print(f"Gemini Error ({model_name}): {e}")
-                error_str = str(e)
-                if "API_KEY_INVALID" in error_str or "API key not valid" in error_str:
-                    self.last_gemini_error = "Gemini API Key is invalid."
-                    # If key is invalid, no model will work, break loop
+                if self._gemini_error_is_fatal(model_name, e):
                     break
+        return None
 
-                # If 404/not found, loop to next model
-                if "404" in error_str or "not found" in error_str:
-                    continue
+    async def _aget_gemini_response(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """
+        Async counterpart of _gemini_generate. The SDK's async client is cached for the
+        whole process and bound to the first event loop, while the app starts a new
+        loop for every voice turn, so the blocking call runs in a worker thread instead.
+        """
+        return await asyncio.to_thread(self._gemini_generate, messages)
 
-                # For other errors, maybe try next model?
-                continue
+    @staticmethod
+    def _gemini_contents(messages: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """
+        Converts chat messages to Gemini's native format: the leading system prompt
+        becomes the system instruction and the turns become user/model contents.
+        Later system messages (e.g. the feedback request) are sent as user turns,
+        since Gemini only accepts a single system instruction.
+        """
+        system_instruction = None
+        start = 0
+        if messages and messages[0]['role'] == "system":
+            system_instruction = messages[0]['content']
+            start = 1
+
+        contents = [
+            {"role": "model" if msg['role'] == "assistant" else "user", "parts": [msg['content']]}
+            for msg in messages[start:]
+        ]
+        if not contents and system_instruction is not None:
+            # Nothing but instructions: send them as the prompt
+            return None, [{"role": "user", "parts": [system_instruction]}]
+        return system_instruction, contents
+
+    @staticmethod
+    def _fold_system_instruction(system_instruction: str, contents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Moves the system instruction into the conversation for models without
+        system_instruction support: it leads the first user turn, or becomes its own
+        user turn when the conversation opens with the model (keeping turns alternating).
+        """
+        if contents and contents[0]["role"] == "user":
+            first = contents[0]
+            return [{"role": "user", "parts": [system_instruction, *first["parts"]]}, *contents[1:]]
+        return [{"role": "user", "parts": [system_instruction]}, *contents]
+
+    def _gemini_error_is_fatal(self, model_name: str, e: Exception) -> bool:
+        """Logs a Gemini failure. Returns True if no other model is worth trying."""
+        print(f"Gemini Error ({model_name}): {e}")
+        if _is_invalid_gemini_key(e):
+            # An unknown key will never work, for any session: switch Gemini off for good.
+            # Both writes are idempotent, so concurrent sessions cannot disagree.
+            self.last_gemini_error = "Gemini API Key is invalid."
+            self.gemini_configured = False
+            return True
+        if _is_gemini_auth_error(e):
+            # Refused for this request only; other models will be refused too
+            return True
+
+        # NotFound (model unavailable), ResourceExhausted and other errors: try the next model
+        return False
+
+    def submit_batch(self, message_lists: List[List[Dict[str, str]]], model: str = "gpt-4o") -> Optional[str]:
+        """
+        Queues the conversations on the OpenAI Batch API for latency-insensitive work
+        (feedback, evaluation runs). Returns the batch id, or None if it could not be queued.
+        Collect the results with wait_for_batch; request i comes back under key "i".
+        """
+        if self.mock or not self.client:
+            return None
+        try:
+            return batch.submit_batch(self.client, message_lists, model)
+        except Exception as e:
+            print(f"OpenAI Batch Error: {e}")
+            return None
 
-        # If all failed
-        return self._get_mock_response(messages)
+    def wait_for_batch(self, batch_id: str, timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+        """Blocks until the batch is done, polling with exponential backoff."""
+        return batch.wait_for_batch(self.client, batch_id, timeout=timeout)
+
+    def submit_batch_feedback(self, messages: List[Dict[str, str]]) -> Optional[str]:
+        """Queues a single feedback request as a batch. Returns the batch id or None."""
+        return self.submit_batch([messages])
 
-    def transcribe_audio(self, audio_file) -> str:
+    def get_batch_feedback(self, batch_id: str) -> Optional[str]:
+        """
+        Returns the response of a batch queued with submit_batch_feedback, or None
+        while it is still running. Raises RuntimeError if the batch did not complete.
         """
-        Transcribes audio file to text using OpenAI Whisper -> Gemini -> Mock.
-        audio_file: file-like object or path
+        try:
+            results = batch.batch_results(self.client, batch_id)
+        except RuntimeError:
+            raise
+        except Exception as e:
+            # Treat transient API errors as "not ready yet"; the caller polls again later
+            print(f"OpenAI Batch Error: {e}")
+            return None
+
+        if results is None:
+            return None
+        feedback = next(iter(results.values()), None)
+        if feedback is None:
+            raise RuntimeError(f"Batch {batch_id} returned no feedback")
+        return feedback
+
+    def transcribe_audio(self, audio: AudioInput) -> Optional[str]:
+        """
+        Transcribes audio to text using OpenAI Whisper -> Gemini -> Mock.
+        audio: raw bytes, file-like object or path
+        Transcriptions are cached on disk by the hash of the audio bytes.
         """
         if self.mock:
             return "This is a mock transcription of the audio."
 
+        # Read once; Whisper, Gemini and the cache key all share these bytes
+        audio_data = self._load_audio_bytes(audio)
+        if audio_data is None:
+            return None
+
+        cache_path = os.path.join(TRANSCRIPTION_CACHE_DIR, f"{hashlib.sha256(audio_data).hexdigest()}.txt")
+        if os.path.exists(cache_path):
+            with open(cache_path, encoding="utf-8") as f:
+                return f.read()
+
+        transcription = None
+
         # Try OpenAI Whisper
         if self.client:
             try:
                 transcription = self.client.audio.transcriptions.create(
                     model="whisper-1",
-                    file=audio_file
-                )
-                return transcription.text
+                    file=("audio.wav", audio_data, "audio/wav")
+                ).text
             except Exception as e:
                 print(f"OpenAI Whisper Error: {e}. Attempting fallback...")
 
         # Try Gemini
-        if self.gemini_configured:
-            result = self._transcribe_audio_gemini(audio_file)
-            if result:
-                return result
-
-        return None # Return None to indicate failure
+        if not transcription and self.gemini_configured:
+            transcription = self._transcribe_audio_gemini(audio_data)
 
-    def _transcribe_audio_gemini(self, audio_file) -> Optional[str]:
-        self.last_gemini_error = None
+        if not transcription:
+            return None # Return None to indicate failure
 
-        # Models that support audio
-        models_to_try = ['gemini-1.5-flash', 'gemini-1.5-pro']
-
-        # Prepare audio data once
+        tmp_path = _unique_tmp_path(cache_path)
         try:
-            # audio_file might be a BytesIO or a path
-            if hasattr(audio_file, 'read'):
-                if hasattr(audio_file, 'seek'):
-                     audio_file.seek(0)
-                audio_data = audio_file.read()
-            else:
-                with open(audio_file, 'rb') as f:
-                    audio_data = f.read()
+            os.makedirs(TRANSCRIPTION_CACHE_DIR, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(transcription)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Error caching transcription: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return transcription
+
+    @staticmethod
+    def _load_audio_bytes(audio: AudioInput) -> Optional[bytes]:
+        """Reads audio given as bytes, a file-like object or a path."""
+        try:
+            if isinstance(audio, (bytes, bytearray)):
+                return bytes(audio)
+            # audio might be a BytesIO (e.g. Streamlit's UploadedFile) or a path
+            if hasattr(audio, 'getvalue'):
+                return audio.getvalue()
+            if hasattr(audio, 'read'):
+                if hasattr(audio, 'seek'):
+                     audio.seek(0)
+                return audio.read()
+            # Paths are memory-mapped: the pages are copied straight into the result
+            # without going through a read buffer
+            with open(audio, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return mm[:]
         except Exception as e:
             print(f"Error reading audio file: {e}")
             return None
 
+    async def atranscribe_audio(self, audio: AudioInput) -> Optional[str]:
+        """Async variant of transcribe_audio; the transcription runs in a worker thread."""
+        return await asyncio.to_thread(self.transcribe_audio, audio)
+
+    def warmup(self) -> None:
+        """Makes a cheap request so the TLS/HTTP session is ready before the first real call."""
+        try:
+            self.client.models.list()
+        except Exception:
+            pass
+
+    async def awarmup(self) -> None:
+        """
+        Opens the async OpenAI connection ahead of the first awaited request,
+        so the TLS handshake overlaps with other work (e.g. transcription).
+        """
+        if self.mock or not self.client:
+            return
+        try:
+            await self._async_client().models.list()
+        except Exception as e:
+            print(f"OpenAI warmup failed: {e}")
+
+    def _transcribe_audio_gemini(self, audio_data: bytes) -> Optional[str]:
+        # Models that support audio
+        models_to_try = ['gemini-1.5-flash', 'gemini-1.5-pro']
+
         for model_name in models_to_try:
             try:
-                model = genai.GenerativeModel(model_name)
+                model = _gemini_model(model_name)
 
                 response = model.generate_content([
                     "Transcribe the following audio accurately.",
@@ -176,68 +908,102 @@ class LLMClient:
                 ])
                 return response.text
             except Exception as e:
-                 print(f"Gemini Transcription Error ({model_name}): {e}")
-                 error_str = str(e)
-                 if "API_KEY_INVALID" in error_str or "API key not valid" in error_str:
-                    self.last_gemini_error = "Gemini API Key is invalid."
-                    return None
-
-                 if "404" in error_str or "not found" in error_str:
-                     continue
-
-                 continue
+                if self._gemini_error_is_fatal(model_name, e):
+                    break
 
         return None
 
-    def text_to_speech(self, text: str) -> str:
+    def tts_cache_key(self, text: str) -> str:
+        """Key under which the synthesized audio for text is cached."""
+        return hashlib.sha256((text + "|" + self.tts_voice).encode()).hexdigest()[:16]
+
+    def text_to_speech(self, text: str) -> Optional[str]:
         """
-        Converts text to speech. Returns path to the audio file.
+        Converts text to speech. Returns path to the audio file, or None on failure.
         Uses OpenAI TTS if available, otherwise gTTS.
         Gemini doesn't support TTS directly in this SDK version easily as OpenAI does.
         So we fallback to gTTS directly if OpenAI fails.
+        Audio is cached on disk by text and voice, so repeated text is not re-synthesized.
         """
         try:
-            # Create a temp file
-            # On Windows, we must close the file before opening it again for writing by external libs
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as fp:
-                output_path = fp.name
-
-            # Now the file is closed, we can write to it by path
-
-            if not self.mock and self.client:
-                try:
-                    response = self.client.audio.speech.create(
-                        model="tts-1",
-                        voice="alloy",
-                        input=text
-                    )
-                    response.stream_to_file(output_path)
-                    return output_path
-                except Exception:
-                    # Fallback to gTTS if OpenAI fails (e.g. quota or model issue)
-                    pass
-
-            # Fallback or Mock
-            tts = gTTS(text=text, lang='en')
-            tts.save(output_path)
+            output_path = os.path.join(TTS_CACHE_DIR, f"{self.tts_cache_key(text)}.mp3")
+            if os.path.exists(output_path):
+                # Mark as recently used so eviction keeps it
+                os.utime(output_path)
+                return output_path
+            os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+
+            # Write next to the final path and rename, so a concurrent reader never
+            # sees a partial file and a failed synthesis leaves nothing behind
+            tmp_path = _unique_tmp_path(output_path)
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(self._synthesize_speech(text))
+                os.replace(tmp_path, output_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            _prune_cache_dir(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES)
             return output_path
 
         except Exception as e:
              print(f"Error in text_to_speech: {e}")
              return None
 
+    def text_to_speech_stream(self, text: str) -> Iterator[bytes]:
+        """
+        Yields MP3 audio for text one sentence-aligned chunk at a time, so playback
+        can start before long replies (e.g. the feedback) are fully synthesized.
+        The next chunk is synthesized in a worker thread while the current one is consumed.
+        Chunks are not cached; use text_to_speech for short, repeated text.
+        """
+        chunks = _split_on_sentence(text)
+        if not chunks:
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            ahead = pool.submit(self._synthesize_speech, chunks[0])
+            for i in range(len(chunks)):
+                try:
+                    audio = ahead.result()
+                except Exception as e:
+                    print(f"Error in text_to_speech_stream: {e}")
+                    return
+                if i + 1 < len(chunks):
+                    ahead = pool.submit(self._synthesize_speech, chunks[i + 1])
+                yield audio
+
+    def _synthesize_speech(self, text: str) -> bytes:
+        """Synthesizes one chunk in memory with OpenAI TTS, falling back to gTTS."""
+        if not self.mock and self.client:
+            try:
+                with self.client.audio.speech.with_streaming_response.create(
+                    model="tts-1",
+                    voice=self.tts_voice,
+                    input=text,
+                    response_format="mp3"
+                ) as response:
+                    return b"".join(response.iter_bytes())
+            except Exception:
+                # Fallback to gTTS if OpenAI fails (e.g. quota or model issue)
+                pass
+
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang='en').write_to_fp(buffer)
+        return buffer.getvalue()
+
+    async def atext_to_speech(self, text: str) -> Optional[str]:
+        """Async variant of text_to_speech; synthesis runs in a worker thread."""
+        return await asyncio.to_thread(self.text_to_speech, text)
+
     def _get_mock_response(self, messages: List[Dict[str, str]]) -> str:
         """
         Generate a mock response based on the last user message.
         This is for testing without an API key.
         """
-        user_inputs = [m['content'].lower() for m in messages if m['role'] == 'user']
-        last_user_input = user_inputs[-1] if user_inputs else ""
-
-        if "sales" in last_user_input:
-            return "Role Confirmed: Sales Representative\nExcellent choice. I will be interviewing you for a Sales position. Let's begin. \n\nCan you tell me about a time you had to sell a difficult product?"
-
-        if "engineer" in last_user_input:
-             return "Role Confirmed: Software Engineer\nExcellent choice. I will be interviewing you for a Software Engineer position. Let's begin. \n\nCan you describe a challenging technical problem you solved recently?"
-
-        return "That's an interesting point. Could you elaborate on that? (Mock response)"
+        # Only the most recent user message matters; find it without copying the history
+        last_user_input = next((m['content'] for m in reversed(messages) if m['role'] == 'user'), "")
+        # Normalize case and whitespace so equivalent inputs share one memoized reply
+        return _mock_reply(" ".join(last_user_input.lower().split()))
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+class TokenBucket:
+    """
+    Async token bucket: allows `rate` units per `per` seconds, with bursts up to `rate`.
+    Used both for requests per minute and tokens per minute.
+    """
+    def __init__(self, rate: float, per: float = 60.0) -> None:
+        self.capacity = rate
+        self.fill_rate = rate / per
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1) -> None:
+        """Waits until `amount` units are available and takes them."""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        # Waiters queue on the lock, so they are served in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.fill_rate)
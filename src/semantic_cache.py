@@ -0,0 +1,56 @@
+from typing import List, Optional
+import threading
+import numpy as np
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    """Scales vector to unit length; zero vectors are returned unchanged."""
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SemanticCache:
+    """
+    Small in-memory cache that maps embeddings to responses. Embeddings are
+    normalized when added, so lookups only need a dot product per entry.
+    A lookup returns the stored response whose embedding is most similar to the
+    query, provided the cosine similarity clears the threshold.
+    Safe to share between threads.
+    """
+    def __init__(self, threshold: float = 0.92, max_entries: int = 128) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.vectors: Optional[np.ndarray] = None  # shape (N, dim)
+        self.responses: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.responses)
+
+    def lookup(self, query: np.ndarray) -> Optional[str]:
+        # Take a consistent snapshot; add() replaces both rather than mutating in place
+        with self._lock:
+            vectors, responses = self.vectors, self.responses
+        if vectors is None or not responses:
+            return None
+
+        # Stored vectors are unit length, so one matrix-vector product gives the cosines
+        sims = vectors @ _normalize(query)
+        best = int(np.argmax(sims))
+        if sims[best] > self.threshold:
+            return responses[best]
+        return None
+
+    def add(self, vector: np.ndarray, response: str) -> None:
+        vector = _normalize(vector)
+        with self._lock:
+            if self.vectors is None:
+                vectors = vector[np.newaxis, :]
+            else:
+                vectors = np.vstack([self.vectors, vector])
+            responses = self.responses + [response]
+
+            # FIFO eviction once over capacity
+            if len(responses) > self.max_entries:
+                vectors = vectors[1:]
+                responses = responses[1:]
+            self.vectors, self.responses = vectors, responses
@@ -0,0 +1,27 @@
+import unittest
+from typing import Iterable
+from src.agent import InterviewAgent
+from src.llm_client import LLMClient
+
+class AgentTestBase(unittest.TestCase):
+    """
+    Base class for tests that drive an InterviewAgent against a mock-mode LLMClient.
+    The client is built once per class (mock mode keeps no per-conversation state);
+    every test gets a fresh agent. Tests that need a pristine client call make_client().
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.client = cls.make_client()
+
+    @staticmethod
+    def make_client() -> LLMClient:
+        return LLMClient(mock=True)
+
+    def setUp(self):
+        self.agent = InterviewAgent(self.client)
+
+    def assert_contains_all(self, text: str, needles: Iterable[str]) -> None:
+        """Asserts every needle occurs in text, reporting all missing needles at once."""
+        missing = [needle for needle in needles if needle not in text]
+        self.assertFalse(missing, f"{missing} not found in {text!r}")
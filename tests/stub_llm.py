@@ -0,0 +1,29 @@
+import json
+import os
+from typing import Dict, Iterator, List
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+class StubLLMClient:
+    """
+    Stand-in for LLMClient that answers from a JSON fixture instead of an API.
+    Each rule is {"contains": ..., "response": ...}; the first rule whose text
+    appears in the last user message (case-insensitively) wins.
+    """
+    default_response = "Could you tell me more about that?"
+
+    def __init__(self, fixture: str = "interview.json"):
+        with open(os.path.join(FIXTURE_DIR, fixture), encoding="utf-8") as f:
+            self.rules = [(rule["contains"].lower(), rule["response"]) for rule in json.load(f)]
+        self.calls: List[List[Dict[str, str]]] = []
+
+    def get_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        self.calls.append(messages)
+        last_user_input = next((m["content"] for m in reversed(messages) if m["role"] == "user"), "").lower()
+        return next((response for needle, response in self.rules if needle in last_user_input), self.default_response)
+
+    async def aget_response(self, messages: List[Dict[str, str]], **kwargs) -> str:
+        return self.get_response(messages, **kwargs)
+
+    def stream_response(self, messages: List[Dict[str, str]], **kwargs) -> Iterator[str]:
+        yield self.get_response(messages, **kwargs)
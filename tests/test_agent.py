@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock
-from src.agent import InterviewAgent, InterviewStage
-from src.llm_client import LLMClient
+from src.agent import InterviewAgent, InterviewStage, INTERVIEWER_PROMPT
+from src.llm_client import LLMClient, count_tokens
 
 class TestInterviewAgent(unittest.TestCase):
     def setUp(self):
@@ -12,6 +12,19 @@ class TestInterviewAgent(unittest.TestCase):
         self.assertEqual(self.agent.stage, InterviewStage.ROLE_SELECTION)
         self.assertIsNone(self.agent.role)
 
+    def test_slots(self):
+        self.assertFalse(hasattr(self.agent, "__dict__"))
+        with self.assertRaises(AttributeError):
+            self.agent.adhoc = True
+
+    def test_roles_are_interned(self):
+        other = InterviewAgent(self.mock_llm)
+
+        self.agent.start(role="".join(["Data ", "Scientist"]))
+        other.start(role="Data Scientist")
+
+        self.assertIs(self.agent.role, other.role)
+
     def test_start(self):
         greeting = self.agent.start()
         self.assertIn("Hello", greeting)
@@ -28,6 +41,16 @@ class TestInterviewAgent(unittest.TestCase):
         self.assertEqual(self.agent.role, "Software Engineer")
         self.assertIn("Software Engineer", response)
 
+    def test_role_selection_uses_generated_first_question(self):
+        self.agent.start()
+        self.mock_llm.get_response.return_value = "Role Confirmed: Data Scientist\nWelcome! How would you validate a churn model?"
+
+        response = self.agent.process_input("data science please")
+
+        self.assertEqual(self.agent.role, "Data Scientist")
+        self.assertEqual(response, "Welcome! How would you validate a churn model?")
+        self.assertEqual(self.mock_llm.get_response.call_count, 1)
+
     def test_role_selection_unclear(self):
         self.agent.start()
         # Mock LLM response to simulate unclear input
@@ -54,6 +77,95 @@ class TestInterviewAgent(unittest.TestCase):
         self.assertEqual(response, "What is your greatest weakness?")
         self.mock_llm.get_response.assert_called()
 
+    def test_wrap_up_hint_keeps_prompt_prefix(self):
+        self.agent.start(role="Tester")
+        self.agent.question_count = self.agent.max_questions
+        prefix = list(self.agent.history)
+
+        self.mock_llm.get_response.return_value = "Shall we wrap up?"
+        self.agent.process_input("Another answer.")
+
+        sent = self.mock_llm.get_response.call_args[0][0]
+        self.assertEqual(sent[:len(prefix)], prefix)
+        self.assertEqual(sent[-1]["role"], "user")
+        self.assertEqual([m["role"] for m in sent].count("system"), 1)
+
+    def test_system_prompt_starts_with_shared_instructions(self):
+        self.agent.start(role="Tester")
+        other = InterviewAgent(self.mock_llm)
+        other.start(role="Data Scientist")
+
+        self.assertTrue(self.agent.history[0]["content"].startswith(INTERVIEWER_PROMPT))
+        self.assertTrue(other.history[0]["content"].startswith(INTERVIEWER_PROMPT))
+
+    def test_system_message_is_shared_per_role(self):
+        self.agent.start(role="Tester")
+        other = InterviewAgent(self.mock_llm)
+        other.start(role="Tester")
+
+        self.assertIs(self.agent.history[0], other.history[0])
+
+    def test_context_window_caps_sent_history(self):
+        self.agent.start(role="Tester")
+        self.agent.max_questions = 100
+        self.mock_llm.get_response.return_value = "Next question?"
+        for i in range(20):
+            self.agent.process_input(f"Answer {i}")
+
+        sent = self.mock_llm.get_response.call_args[0][0]
+        self.assertEqual(sent[0]["role"], "system")
+        self.assertLessEqual(len(sent), 1 + 16)
+        self.assertGreater(len(sent), 1 + 8)
+        self.assertEqual(sent[-1]["content"], "Answer 19")
+
+        # Feedback still sees the whole conversation
+        self.agent.end_interview()
+        self.assertIn({"role": "user", "content": "Answer 0"}, self.mock_llm.get_response.call_args[0][0])
+
+    def test_context_window_prefix_holds_across_turns(self):
+        self.agent.start(role="Tester")
+        self.agent.max_questions = 100
+        self.mock_llm.get_response.return_value = "Next question?"
+        windows = []
+        for i in range(30):
+            self.agent.process_input(f"Answer {i}")
+            windows.append(self.mock_llm.get_response.call_args[0][0])
+
+        # Once trimming starts, most turns extend the previous window instead of shifting it
+        extended = sum(1 for prev, cur in zip(windows, windows[1:]) if cur[:len(prev)] == prev)
+        self.assertGreaterEqual(extended, len(windows) * 2 // 3)
+
+    def test_context_window_respects_token_budget(self):
+        self.agent.start(role="Tester")
+        self.agent.context_token_budget = 600
+        self.mock_llm.get_response.return_value = "Next question?"
+        long_answer = "word " * 200
+        for _ in range(4):
+            self.agent.process_input(long_answer)
+
+        sent = self.mock_llm.get_response.call_args[0][0]
+        self.assertLessEqual(count_tokens(sent), 600)
+        self.assertEqual(sent[-1]["content"], long_answer)
+
+    def test_stream_input(self):
+        self.agent.start(role="Tester")
+        self.mock_llm.stream_response.return_value = iter(["What is ", "your greatest ", "strength?"])
+
+        chunks = list(self.agent.stream_input("I enjoy testing."))
+
+        self.assertEqual(chunks, ["What is ", "your greatest ", "strength?"])
+        self.assertEqual(self.agent.history[-1], {"role": "assistant", "content": "What is your greatest strength?"})
+
+    def test_stream_input_role_selection_yields_whole_reply(self):
+        self.agent.start()
+        self.mock_llm.get_response.return_value = "Role Confirmed: Software Engineer"
+
+        chunks = list(self.agent.stream_input("I want to be a software engineer"))
+
+        self.assertEqual(len(chunks), 1)
+        self.assertIn("Software Engineer", chunks[0])
+        self.mock_llm.stream_response.assert_not_called()
+
     def test_end_interview_trigger(self):
         self.agent.start()
         self.agent.stage = InterviewStage.INTERVIEW
@@ -67,5 +179,36 @@ class TestInterviewAgent(unittest.TestCase):
         self.assertEqual(self.agent.stage, InterviewStage.FINISHED)
         self.assertIn("Here is your feedback", response)
 
+    def test_deferred_feedback(self):
+        self.agent.async_feedback = True
+        self.agent.start(role="Tester")
+        self.mock_llm.submit_batch_feedback.return_value = "batch_123"
+
+        response = self.agent.process_input("end interview")
+
+        self.assertEqual(self.agent.stage, InterviewStage.FINISHED)
+        self.assertIn("batch_123", response)
+        self.mock_llm.get_response.assert_not_called()
+
+        self.mock_llm.get_batch_feedback.return_value = None
+        self.assertIsNone(self.agent.collect_feedback())
+
+        self.mock_llm.get_batch_feedback.return_value = "Great job!"
+        self.assertEqual(self.agent.collect_feedback(), "Great job!")
+        self.assertEqual(self.agent.history[-1]["content"], "Great job!")
+        self.assertEqual(self.agent.transcript[-1]["content"], "Great job!")
+        self.assertIsNone(self.agent.feedback_batch_id)
+
+    def test_deferred_feedback_falls_back_when_batch_fails(self):
+        self.agent.async_feedback = True
+        self.agent.start(role="Tester")
+        self.mock_llm.submit_batch_feedback.return_value = "batch_123"
+        self.agent.process_input("end interview")
+
+        self.mock_llm.get_batch_feedback.side_effect = RuntimeError("Batch batch_123 expired")
+        self.mock_llm.get_response.return_value = "Direct feedback"
+
+        self.assertEqual(self.agent.collect_feedback(), "Direct feedback")
+
 if __name__ == '__main__':
     unittest.main()
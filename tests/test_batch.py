@@ -0,0 +1,55 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from src import batch
+
+def output_line(custom_id, content):
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}},
+        "error": None,
+    })
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.files.create.return_value.id = "file_1"
+        self.client.batches.create.return_value.id = "batch_1"
+
+    def test_submit_batch_writes_one_line_per_request(self):
+        batch_id = batch.submit_batch(self.client, [
+            [{"role": "user", "content": "first"}],
+            [{"role": "user", "content": "second"}],
+        ])
+
+        self.assertEqual(batch_id, "batch_1")
+        _, payload = self.client.files.create.call_args.kwargs["file"]
+        lines = [json.loads(line) for line in payload.decode().splitlines()]
+        self.assertEqual([line["custom_id"] for line in lines], ["0", "1"])
+        self.assertEqual(lines[1]["body"]["messages"][0]["content"], "second")
+
+    def test_wait_for_batch_backs_off_until_complete(self):
+        running = MagicMock(status="in_progress")
+        done = MagicMock(status="completed", output_file_id="out_1")
+        self.client.batches.retrieve.side_effect = [running, running, done]
+        self.client.files.content.return_value.text = "\n".join([output_line("0", "A"), output_line("1", "B")])
+
+        with patch("src.batch.time.sleep") as sleep:
+            results = batch.wait_for_batch(self.client, "batch_1", poll_interval=1)
+
+        self.assertEqual(results, {"0": "A", "1": "B"})
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [1, 2])
+
+    def test_failed_batch_raises(self):
+        self.client.batches.retrieve.return_value = MagicMock(status="expired")
+
+        with self.assertRaises(RuntimeError):
+            batch.wait_for_batch(self.client, "batch_1")
+
+    def test_failed_request_maps_to_none(self):
+        failed = json.dumps({"custom_id": "0", "response": None, "error": {"message": "boom"}})
+
+        self.assertEqual(batch.parse_results(failed + "\n" + output_line("1", "B")), {"0": None, "1": "B"})
+
+if __name__ == '__main__':
+    unittest.main()
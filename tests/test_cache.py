@@ -0,0 +1,189 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from src import llm_client
+from src.llm_client import LLMClient
+
+def make_completion(text):
+    completion = MagicMock()
+    completion.choices[0].message.content = text
+    return completion
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.client = LLMClient(api_key="fake-key", mock=False)
+        self.client.client = MagicMock()
+        self.client.client.chat.completions.create.return_value = make_completion("Cached answer")
+
+    def test_deterministic_call_is_cached(self):
+        messages = [{"role": "user", "content": "Hello"}]
+
+        first = self.client.get_response(messages, temperature=0)
+        second = self.client.get_response(messages, temperature=0)
+
+        self.assertEqual(first, "Cached answer")
+        self.assertEqual(second, "Cached answer")
+        self.assertEqual(self.client.client.chat.completions.create.call_count, 1)
+        self.assertEqual(self.client.cache.stats, {"hits": 1, "misses": 1})
+
+    def test_prompt_cache_usage_is_recorded(self):
+        completion = make_completion("Answer")
+        completion.usage.prompt_tokens = 1500
+        completion.usage.prompt_tokens_details.cached_tokens = 1024
+        self.client.client.chat.completions.create.return_value = completion
+
+        self.client.get_response([{"role": "user", "content": "Hello"}])
+
+        self.assertEqual(self.client.usage, {"prompt_tokens": 1500, "cached_tokens": 1024})
+
+    def test_sampled_call_is_not_cached(self):
+        messages = [{"role": "user", "content": "Hello"}]
+
+        self.client.get_response(messages, temperature=0.7)
+        self.client.get_response(messages, temperature=0.7)
+
+        self.assertEqual(self.client.client.chat.completions.create.call_count, 2)
+
+    def test_cache_evicts_oldest_entry(self):
+        self.client.cache.backend.max_entries = 2
+        for i in range(3):
+            self.client.get_response([{"role": "user", "content": f"Question {i}"}], temperature=0)
+
+        self.assertEqual(len(self.client.cache), 2)
+
+    def test_cache_is_shared_across_threads(self):
+        # The app hands one client to every session thread
+        self.client.cache.backend.max_entries = 50
+
+        def worker(n):
+            for i in range(200):
+                self.client._cache_put(f"{n}-{i}", "answer")
+                self.client._cache_get(f"{n}-{i - 1}")
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(self.client.cache), 50)
+
+    def test_disk_cache_is_shared_between_clients(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with patch.dict(os.environ, {"LLM_CACHE_DIR": tmp.name, "LLM_CACHE_TTL": "60"}):
+            first = LLMClient(api_key="fake-key", mock=False)
+            first.client = self.client.client
+            first.get_response(messages, temperature=0)
+
+            # A fresh client (e.g. after a restart) answers from disk without calling the API
+            second = LLMClient(api_key="fake-key", mock=False)
+            second.client = MagicMock()
+            self.assertEqual(second.get_response(messages, temperature=0), "Cached answer")
+
+        second.client.chat.completions.create.assert_not_called()
+        self.assertEqual(second.cache.ttl, 60)
+
+    def test_failed_disk_write_keeps_openai_answer(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        messages = [{"role": "user", "content": "Hello"}]
+
+        with patch.dict(os.environ, {"LLM_CACHE_DIR": tmp.name, "LLM_CACHE_TTL": "a week"}):
+            client = LLMClient(api_key="fake-key", mock=False)
+        client.client = self.client.client
+        self.assertIsNone(client.cache.ttl)
+
+        with patch("src.llm_cache.json.dump", side_effect=OSError("No space left on device")):
+            self.assertEqual(client.get_response(messages, temperature=0), "Cached answer")
+
+        self.assertEqual(os.listdir(tmp.name), [])
+
+class TestTTSCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch.object(llm_client, "TTS_CACHE_DIR", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+        self.client = LLMClient(api_key="fake-key", mock=False)
+        self.client.client = MagicMock()
+        self.speech = self.client.client.audio.speech.with_streaming_response.create
+        self.speech.return_value.__enter__.return_value.iter_bytes.return_value = [b"mp3"]
+
+    def test_repeated_text_is_synthesized_once(self):
+        first = self.client.text_to_speech("Tell me about yourself.")
+        second = self.client.text_to_speech("Tell me about yourself.")
+
+        self.assertEqual(first, second)
+        self.assertTrue(os.path.exists(first))
+        self.assertEqual(self.speech.call_count, 1)
+
+    def test_least_recently_used_audio_is_evicted(self):
+        with patch.object(llm_client, "TTS_CACHE_MAX_BYTES", 6):
+            first = self.client.text_to_speech("First")
+            second = self.client.text_to_speech("Second")
+            os.utime(first, (0, 0))
+            os.utime(second, (1, 1))
+
+            # A cache hit refreshes the file's position
+            self.client.text_to_speech("First")
+            self.client.text_to_speech("Third")
+
+        self.assertTrue(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), sorted(
+            os.path.basename(p) for p in (first, self.client.text_to_speech("Third"))
+        ))
+
+    def test_cache_key_depends_on_voice(self):
+        key = self.client.tts_cache_key("Hello")
+        self.client.tts_voice = "nova"
+        self.assertNotEqual(key, self.client.tts_cache_key("Hello"))
+
+class TestTranscriptionCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        patcher = patch.object(llm_client, "TRANSCRIPTION_CACHE_DIR", self.tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.tmp.cleanup)
+
+        self.client = LLMClient(api_key="fake-key", mock=False)
+        self.client.client = MagicMock()
+        self.client.client.audio.transcriptions.create.return_value.text = "I am a software engineer."
+
+    def test_identical_audio_is_transcribed_once(self):
+        first = self.client.transcribe_audio(b"audio-bytes")
+        second = self.client.transcribe_audio(io.BytesIO(b"audio-bytes"))
+
+        self.assertEqual(first, "I am a software engineer.")
+        self.assertEqual(second, first)
+        self.assertEqual(self.client.client.audio.transcriptions.create.call_count, 1)
+
+    def test_path_input_shares_cache_with_bytes(self):
+        path = os.path.join(self.tmp.name, "answer.wav")
+        with open(path, "wb") as f:
+            f.write(b"audio-bytes")
+
+        self.client.transcribe_audio(path)
+        self.client.transcribe_audio(b"audio-bytes")
+
+        self.assertEqual(self.client.client.audio.transcriptions.create.call_count, 1)
+        sent = self.client.client.audio.transcriptions.create.call_args.kwargs["file"]
+        self.assertEqual(sent, ("audio.wav", b"audio-bytes", "audio/wav"))
+
+    def test_failed_transcription_is_not_cached(self):
+        self.client.client.audio.transcriptions.create.side_effect = Exception("Error code: 429")
+
+        self.assertIsNone(self.client.transcribe_audio(b"audio-bytes"))
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+if __name__ == '__main__':
+    unittest.main()
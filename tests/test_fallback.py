@@ -1,5 +1,7 @@
+import asyncio
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock, call, patch
+from src import llm_client
 from src.llm_client import LLMClient
 
 class TestLLMClientFallback(unittest.TestCase):
@@ -32,8 +34,183 @@ class TestLLMClientFallback(unittest.TestCase):
         # Wait, let's check `src/llm_client.py`.
 
         # It returns None.
-        response = client.transcribe_audio("fake_audio_file")
+        response = client.transcribe_audio(b"fake_audio_bytes")
         self.assertIsNone(response)
 
+    def _hedged_client(self, openai_delay):
+        client = LLMClient(api_key="fake-key", mock=False)
+        client.hedge_delay = 0.05
+        client.gemini_configured = True
+
+        async def slow_openai(**kwargs):
+            await asyncio.sleep(openai_delay)
+            completion = MagicMock()
+            completion.choices[0].message.content = "OpenAI answer"
+            return completion
+
+        aclient = MagicMock()
+        aclient.chat.completions.create = slow_openai
+        client._async_client = MagicMock(return_value=aclient)
+        client._aget_gemini_response = AsyncMock(return_value="Gemini answer")
+        return client
+
+    def test_async_hedges_slow_openai_with_gemini(self):
+        client = self._hedged_client(openai_delay=5)
+
+        response = asyncio.run(client.aget_response([{"role": "user", "content": "Hello"}]))
+
+        self.assertEqual(response, "Gemini answer")
+
+    def test_async_fast_openai_skips_gemini(self):
+        client = self._hedged_client(openai_delay=0)
+
+        response = asyncio.run(client.aget_response([{"role": "user", "content": "Hello"}]))
+
+        self.assertEqual(response, "OpenAI answer")
+        client._aget_gemini_response.assert_not_called()
+
+    def test_identical_async_requests_share_one_call(self):
+        client = self._hedged_client(openai_delay=0.01)
+        create = AsyncMock(wraps=client._async_client().chat.completions.create)
+        client._async_client().chat.completions.create = create
+        messages = [{"role": "user", "content": "Hello"}]
+
+        async def run():
+            return await asyncio.gather(*(client.aget_response(messages, temperature=0) for _ in range(10)))
+
+        responses = asyncio.run(run())
+
+        self.assertEqual(responses, ["OpenAI answer"] * 10)
+        self.assertEqual(create.await_count, 1)
+        self.assertEqual(client._inflight, {})
+
+    def test_abatch_keeps_order(self):
+        client = LLMClient(mock=True)
+
+        responses = asyncio.run(client.abatch([
+            [{"role": "user", "content": "sales"}],
+            [{"role": "user", "content": "engineer"}],
+        ]))
+
+        self.assertIn("Sales Representative", responses[0])
+        self.assertIn("Software Engineer", responses[1])
+
+    def test_gemini_models_are_reused(self):
+        llm_client._gemini_model.cache_clear()
+        self.addCleanup(llm_client._gemini_model.cache_clear)
+        client = LLMClient(mock=True)
+
+        with patch.object(llm_client, "genai") as genai:
+            genai.GenerativeModel.return_value.generate_content.return_value.text = "Gemini answer"
+            for _ in range(3):
+                self.assertEqual(client._gemini_generate([{"role": "user", "content": "Hi"}]), "Gemini answer")
+
+        genai.GenerativeModel.assert_called_once_with("gemini-1.5-flash", system_instruction=None)
+
+    def test_async_gemini_works_across_event_loops(self):
+        llm_client._gemini_model.cache_clear()
+        self.addCleanup(llm_client._gemini_model.cache_clear)
+        client = LLMClient(mock=True)
+        client.mock = False
+        client.gemini_configured = True
+        messages = [{"role": "user", "content": "Hi"}]
+
+        with patch.object(llm_client, "genai") as genai:
+            genai.GenerativeModel.return_value.generate_content.return_value.text = "Gemini answer"
+            # The SDK's async client is bound to the first loop it ran on
+            genai.GenerativeModel.return_value.generate_content_async.side_effect = RuntimeError("Event loop is closed")
+            # Each asyncio.run() is a new event loop, as in the app's voice turns
+            for _ in range(2):
+                self.assertEqual(asyncio.run(client.aget_response(messages)), "Gemini answer")
+
+    def test_gemini_error_classification(self):
+        from google.api_core import exceptions as google_exceptions
+        llm_client._load_genai()
+        llm_client._gemini_model.cache_clear()
+        self.addCleanup(llm_client._gemini_model.cache_clear)
+        client = LLMClient(mock=True)
+        client.gemini_configured = True
+        messages = [{"role": "user", "content": "Hi"}]
+
+        with patch.object(llm_client, "genai") as genai:
+            generate = genai.GenerativeModel.return_value.generate_content
+
+            # A missing model moves on to the next one
+            generate.side_effect = [google_exceptions.NotFound("no such model"), MagicMock(text="Gemini answer")]
+            self.assertEqual(client._gemini_generate(messages), "Gemini answer")
+            self.assertIsNone(client.last_gemini_error)
+
+            # A refused request stops immediately, but only for this request
+            generate.reset_mock()
+            generate.side_effect = google_exceptions.PermissionDenied("denied")
+            self.assertIsNone(client._gemini_generate(messages))
+            self.assertEqual(generate.call_count, 1)
+            self.assertTrue(client.gemini_configured)
+            self.assertIsNone(client.last_gemini_error)
+
+            # An invalid key switches Gemini off for every session
+            generate.reset_mock()
+            generate.side_effect = google_exceptions.InvalidArgument(
+                "API key not valid", error_info=MagicMock(reason="API_KEY_INVALID"))
+            self.assertIsNone(client._gemini_generate(messages))
+            self.assertEqual(generate.call_count, 1)
+            self.assertFalse(client.gemini_configured)
+            self.assertEqual(client.last_gemini_error, "Gemini API Key is invalid.")
+
+    def test_gemini_per_model_system_instruction(self):
+        llm_client._gemini_model.cache_clear()
+        self.addCleanup(llm_client._gemini_model.cache_clear)
+        client = LLMClient(mock=True)
+        messages = [
+            {"role": "system", "content": "Be an interviewer."},
+            {"role": "assistant", "content": "Tell me about yourself."},
+            {"role": "user", "content": "I build APIs."},
+        ]
+
+        def model(name, system_instruction=None):
+            instance = MagicMock()
+            if name == "gemini-pro":
+                instance.generate_content.return_value.text = "Gemini Pro answer"
+            else:
+                instance.generate_content.side_effect = Exception("model unavailable")
+            return instance
+
+        with patch.object(llm_client, "genai") as genai:
+            genai.GenerativeModel.side_effect = model
+            self.assertEqual(client._gemini_generate(messages), "Gemini Pro answer")
+
+        self.assertEqual(genai.GenerativeModel.call_args_list, [
+            call("gemini-1.5-flash", system_instruction="Be an interviewer."),
+            call("gemini-1.5-pro", system_instruction="Be an interviewer."),
+            call("gemini-pro", system_instruction=None),
+        ])
+        # gemini-pro gets the instruction as a leading user turn instead
+        pro = llm_client._gemini_model("gemini-pro")
+        pro.generate_content.assert_called_once_with([
+            {"role": "user", "parts": ["Be an interviewer."]},
+            {"role": "model", "parts": ["Tell me about yourself."]},
+            {"role": "user", "parts": ["I build APIs."]},
+        ])
+
+    def test_fold_system_instruction_into_first_user_turn(self):
+        contents = LLMClient._fold_system_instruction("Be brief.", [{"role": "user", "parts": ["Hi"]}])
+
+        self.assertEqual(contents, [{"role": "user", "parts": ["Be brief.", "Hi"]}])
+
+    def test_gemini_native_contents(self):
+        system_instruction, contents = LLMClient._gemini_contents([
+            {"role": "system", "content": "Be an interviewer."},
+            {"role": "user", "content": "Hi"},
+            {"role": "assistant", "content": "Tell me about yourself."},
+            {"role": "system", "content": "Give feedback."},
+        ])
+
+        self.assertEqual(system_instruction, "Be an interviewer.")
+        self.assertEqual(contents, [
+            {"role": "user", "parts": ["Hi"]},
+            {"role": "model", "parts": ["Tell me about yourself."]},
+            {"role": "user", "parts": ["Give feedback."]},
+        ])
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,19 +1,20 @@
+import asyncio
 import unittest
 from src.agent import InterviewAgent, InterviewStage
-from src.llm_client import LLMClient
+from stub_llm import StubLLMClient
+from _base import AgentTestBase
 
-class TestInterviewAgentIntegration(unittest.TestCase):
+class TestInterviewAgentIntegration(AgentTestBase):
     def test_mock_flow(self):
         # Use actual LLMClient in mock mode
-        client = LLMClient(mock=True)
-        agent = InterviewAgent(client)
+        agent = self.agent
 
         greeting = agent.start()
         self.assertIn("Hello", greeting)
 
         # Test Role Selection
         response = agent.process_input("I want to be a software engineer")
-        self.assertIn("Software Engineer", response)
+        self.assert_contains_all(response, ["Software Engineer", "Let's begin", "?"])
         self.assertEqual(agent.stage, InterviewStage.INTERVIEW)
         self.assertEqual(agent.role, "Software Engineer")
 
@@ -29,5 +30,101 @@ class TestInterviewAgentIntegration(unittest.TestCase):
         response = agent.process_input("end interview")
         self.assertEqual(agent.stage, InterviewStage.FINISHED)
 
+    def test_mock_flow_async(self):
+        agent = self.agent
+        agent.start()
+
+        response = asyncio.run(agent.aprocess_input("I want to be a software engineer"))
+        self.assertIn("Software Engineer", response)
+        self.assertEqual(agent.stage, InterviewStage.INTERVIEW)
+
+        asyncio.run(agent.aprocess_input("end interview"))
+        self.assertEqual(agent.stage, InterviewStage.FINISHED)
+
+    def test_assert_contains_all_overlapping_needles(self):
+        text = "I will be interviewing you for a Software Engineer position. Let's begin."
+
+        self.assert_contains_all(text, ["Software Engineer", "Engineer", "Let", "Let's begin"])
+        with self.assertRaises(AssertionError):
+            self.assert_contains_all(text, ["Engineer", "Manager"])
+
+    def test_transcript_frozen_after_end(self):
+        agent = self.agent
+        agent.start(role="Software Engineer")
+        self.assertIsNone(agent.transcript)
+
+        agent.process_input("end interview")
+        transcript = agent.transcript
+
+        self.assertIsInstance(transcript, tuple)
+        self.assertEqual(list(transcript), agent.history)
+
+        response = agent.process_input("One more thing")
+        self.assertIn("finished", response)
+        self.assertIs(agent.transcript, transcript)
+        self.assertEqual(len(agent.history), len(transcript))
+
+        agent.start()
+        self.assertIsNone(agent.transcript)
+
+    def test_exit_phrases_match_whole_words(self):
+        agent = self.agent
+        agent.start(role="Software Engineer")
+
+        agent.process_input("I just finished my degree in physics.")
+        self.assertEqual(agent.stage, InterviewStage.INTERVIEW)
+
+        agent.process_input("Let's FINISH here.")
+        self.assertEqual(agent.stage, InterviewStage.FINISHED)
+
+    def test_mock_role_selection(self):
+        cases = [
+            ("I want to be a software engineer", "Software Engineer"),
+            ("Sales please", "Sales Representative"),
+            ("Product Manager", "Product Manager"),
+            ("data scientist", "Data Scientist"),
+        ]
+        for user_input, role in cases:
+            with self.subTest(user_input=user_input):
+                agent = InterviewAgent(self.client)
+                agent.start()
+
+                agent.process_input(user_input)
+
+                self.assertEqual(agent.role, role)
+                self.assertEqual(agent.stage, InterviewStage.INTERVIEW)
+
+    def test_scripted_flow(self):
+        agent = self.agent
+        agent.start()
+
+        responses = agent.process_inputs(["I want to be a software engineer", "I solve problems using Python.", "end interview"])
+
+        self.assertEqual(len(responses), 3)
+        self.assertIn("Software Engineer", responses[0])
+        self.assertIn("Mock response", responses[1])
+        self.assertEqual(agent.stage, InterviewStage.FINISHED)
+
+class TestFixtureFlow(unittest.TestCase):
+    def test_fixture_driven_interview(self):
+        llm = StubLLMClient()
+        agent = InterviewAgent(llm)
+        agent.start()
+
+        responses = agent.process_inputs([
+            "I want to be a software engineer",
+            "Mostly Python services.",
+            "I write unit tests first.",
+            "end interview",
+        ])
+
+        self.assertEqual(agent.role, "Software Engineer")
+        self.assertEqual(responses[0], "Welcome! Tell me about a system you designed recently.")
+        self.assertEqual(responses[1], "How do you make sure your Python code is correct?")
+        self.assertEqual(responses[2], "Good. How do you decide what not to test?")
+        self.assertTrue(responses[3].startswith("Feedback:"))
+        self.assertEqual(agent.stage, InterviewStage.FINISHED)
+        self.assertEqual(len(llm.calls), 4)
+
 if __name__ == '__main__':
     unittest.main()
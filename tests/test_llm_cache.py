@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.llm_cache import LLMCache, MemoryBackend, FileBackend
+
+class TestLLMCache(unittest.TestCase):
+    def test_key_ignores_dict_ordering(self):
+        a = LLMCache.make_key("gpt-4o", [{"role": "user", "content": "Hi"}], 0)
+        b = LLMCache.make_key("gpt-4o", [{"content": "Hi", "role": "user"}], 0)
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, LLMCache.make_key("gpt-4o", [{"role": "user", "content": "Hi"}], 0.2))
+
+    def test_entries_expire_after_ttl(self):
+        cache = LLMCache(MemoryBackend(), ttl=60)
+        with patch("src.llm_cache.time.time", return_value=1000.0):
+            cache.set("k", "answer")
+            self.assertEqual(cache.get("k"), "answer")
+        with patch("src.llm_cache.time.time", return_value=1061.0):
+            self.assertIsNone(cache.get("k"))
+
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.stats, {"hits": 1, "misses": 1})
+
+    def test_file_backend_persists_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            LLMCache(FileBackend(tmp)).set("k", "answer")
+
+            cache = LLMCache(FileBackend(tmp))
+            self.assertEqual(cache.get("k"), "answer")
+            self.assertEqual(len(cache), 1)
+            self.assertEqual(os.listdir(tmp), ["k.json"])
+
+    def test_file_backend_write_failure_is_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = LLMCache(FileBackend(tmp))
+            with patch("src.llm_cache.os.replace", side_effect=OSError("No space left on device")):
+                cache.set("k", "answer")
+
+            self.assertIsNone(cache.get("k"))
+            self.assertEqual(os.listdir(tmp), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,28 +1,126 @@
+import asyncio
 import unittest
+from unittest.mock import MagicMock, patch
 from src.agent import InterviewAgent, InterviewStage
-from src.llm_client import LLMClient
+from src.llm_client import LLMClient, _mock_reply, _split_on_sentence
+from _base import AgentTestBase
 
-class TestInterviewAgentNewFeatures(unittest.TestCase):
+class TestInterviewAgentNewFeatures(AgentTestBase):
     def test_start_with_role(self):
-        client = LLMClient(mock=True)
-        agent = InterviewAgent(client)
+        for role in ["Data Scientist", "Software Engineer", "Product Manager"]:
+            with self.subTest(role=role):
+                agent = InterviewAgent(self.client)
 
-        # Start with specific role
-        agent.start(role="Data Scientist")
+                # Start with specific role
+                agent.start(role=role)
 
-        self.assertEqual(agent.role, "Data Scientist")
-        self.assertEqual(agent.stage, InterviewStage.INTERVIEW)
-        self.assertTrue(len(agent.history) > 0)
-        # Verify system prompt contains role
-        self.assertIn("Data Scientist", agent.history[0]['content'])
+                self.assertEqual(agent.role, role)
+                self.assertEqual(agent.stage, InterviewStage.INTERVIEW)
+                self.assertTrue(len(agent.history) > 0)
+                # Verify system prompt contains role
+                self.assertIn(role, agent.history[0]['content'])
 
     def test_start_without_role(self):
-        client = LLMClient(mock=True)
-        agent = InterviewAgent(client)
+        agent = self.agent
 
         agent.start()
         self.assertEqual(agent.stage, InterviewStage.ROLE_SELECTION)
         self.assertIsNone(agent.role)
 
+    def test_async_voice_helpers(self):
+        client = self.client
+
+        async def run():
+            return await asyncio.gather(client.atranscribe_audio(b"audio"), client.awarmup())
+
+        transcription, _ = asyncio.run(run())
+        self.assertEqual(transcription, "This is a mock transcription of the audio.")
+
+    def test_async_client_shared_per_loop(self):
+        first = LLMClient(api_key="fake-key", mock=False)
+        second = LLMClient(api_key="fake-key", mock=False)
+
+        async def clients():
+            return first._async_client(), second._async_client()
+
+        a, b = asyncio.run(clients())
+        self.assertIs(a, b)
+        # A new event loop gets a new client, since connection pools are loop-bound
+        c, _ = asyncio.run(clients())
+        self.assertIsNot(a, c)
+
+    def test_warmup_is_opt_in(self):
+        with patch("src.llm_client.threading.Thread") as thread:
+            LLMClient(api_key="fake-key", mock=False)
+            thread.assert_not_called()
+
+            client = LLMClient(api_key="fake-key", mock=False, warmup=True)
+            thread.assert_called_once_with(target=client.warmup, daemon=True)
+
+    def test_aclose_releases_loop_clients(self):
+        client = LLMClient(api_key="fake-key", mock=False)
+
+        async def run():
+            aclient = client._async_client()
+            await client.aclose()
+            return aclient, client._async_client()
+
+        closed, replacement = asyncio.run(run())
+        self.assertTrue(closed.is_closed())
+        self.assertIsNot(closed, replacement)
+        self.assertFalse(replacement.is_closed())
+
+    def test_mock_role_replies(self):
+        client = self.client
+
+        response = client.get_response([{"role": "user", "content": "I'd like to practice as a Product Manager"}])
+        self.assertTrue(response.startswith("Role Confirmed: Product Manager"))
+
+        # Only the latest user message is considered
+        response = client.get_response([
+            {"role": "user", "content": "sales"},
+            {"role": "assistant", "content": "Role Confirmed: Sales Representative"},
+            {"role": "user", "content": "I closed a big deal last year."},
+        ])
+        self.assertIn("Mock response", response)
+
+        # Keywords only match whole words
+        response = client.get_response([{"role": "user", "content": "I work in presales engineering"}])
+        self.assertIn("Mock response", response)
+
+        # Inputs differing only in case and spacing share one memoized reply
+        client.get_response([{"role": "user", "content": "I want to be a Software Engineer"}])
+        hits = _mock_reply.cache_info().hits
+        client.get_response([{"role": "user", "content": "  i want to be a   software engineer "}])
+        self.assertEqual(_mock_reply.cache_info().hits, hits + 1)
+
+    def test_split_on_sentence(self):
+        text = "First sentence here. Second one follows! " * 30
+
+        chunks = _split_on_sentence(text, first_max=100, rest_max=400)
+
+        self.assertLessEqual(len(chunks[0]), 100)
+        self.assertTrue(all(len(c) <= 400 for c in chunks))
+        self.assertTrue(chunks[0].endswith((".", "!")))
+        self.assertEqual(" ".join(chunks), text.strip())
+
+    def test_text_to_speech_stream_yields_chunks_in_order(self):
+        client = LLMClient(api_key="fake-key", mock=False)
+        client.client = MagicMock()
+
+        def speech(**kwargs):
+            response = MagicMock()
+            response.__enter__.return_value.iter_bytes.return_value = [kwargs["input"][:5].encode()]
+            return response
+
+        client.client.audio.speech.with_streaming_response.create.side_effect = speech
+        text = "Alpha sentence. " + "Bravo sentence. " * 60
+
+        audio = list(client.text_to_speech_stream(text))
+
+        self.assertGreater(len(audio), 1)
+        self.assertEqual(audio[0], b"Alpha")
+        self.assertEqual(b"".join(audio).count(b"Bravo"), len(audio) - 1)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,53 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import MagicMock
+from openai import RateLimitError
+from src.llm_client import LLMClient
+from src.rate_limit import TokenBucket
+
+class TestTokenBucket(unittest.TestCase):
+    def test_waits_once_burst_is_spent(self):
+        async def run():
+            bucket = TokenBucket(rate=2, per=0.2)
+            start = time.monotonic()
+            for _ in range(3):
+                await bucket.acquire()
+            return time.monotonic() - start
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.09)
+
+class TestParallelMap(unittest.TestCase):
+    def setUp(self):
+        self.client = LLMClient(api_key="fake-key", mock=False)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+        async def create(messages, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise RateLimitError("Too many requests", response=MagicMock(headers={"retry-after": "0"}), body=None)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+            completion = MagicMock()
+            completion.choices[0].message.content = f"Reply to {messages[-1]['content']}"
+            return completion
+
+        aclient = MagicMock()
+        aclient.chat.completions.create = create
+        self.client._async_client = MagicMock(return_value=aclient)
+
+    def test_results_in_order_with_retry_and_concurrency_cap(self):
+        message_lists = [[{"role": "user", "content": f"Q{i}"}] for i in range(6)]
+
+        results = self.client.parallel_map_sync(message_lists, max_concurrency=2)
+
+        self.assertEqual(results, [f"Reply to Q{i}" for i in range(6)])
+        self.assertEqual(self.calls, 7)
+        self.assertLessEqual(self.max_in_flight, 2)
+
+if __name__ == '__main__':
+    unittest.main()
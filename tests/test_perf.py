@@ -0,0 +1,62 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import MagicMock
+from src.agent import InterviewAgent
+from src.llm_client import LLMClient
+
+# Timing-sensitive, so only run on request: RUN_PERF=1 python -m unittest tests.test_perf
+@unittest.skipUnless(os.getenv("RUN_PERF"), "set RUN_PERF=1 to run performance checks")
+class TestPerformance(unittest.TestCase):
+    LATENCY = 0.05  # Simulated provider round trip, in seconds
+
+    def _slow_client(self):
+        client = LLMClient(api_key="fake-key", mock=False)
+
+        async def create(messages, **kwargs):
+            await asyncio.sleep(self.LATENCY)
+            completion = MagicMock()
+            completion.choices[0].message.content = f"Reply to {messages[-1]['content']}"
+            return completion
+
+        aclient = MagicMock()
+        aclient.chat.completions.create = create
+        client._async_client = MagicMock(return_value=aclient)
+        return client
+
+    def test_abatch_overlaps_requests(self):
+        client = self._slow_client()
+        message_lists = [[{"role": "user", "content": f"Q{i}"}] for i in range(10)]
+
+        async def sequential():
+            return [await client.aget_response(messages) for messages in message_lists]
+
+        start = time.perf_counter()
+        expected = asyncio.run(sequential())
+        sequential_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = asyncio.run(client.abatch(message_lists))
+        batched_time = time.perf_counter() - start
+
+        self.assertEqual(results, expected)
+        # Ten overlapping calls should cost close to one round trip, not ten
+        self.assertLess(batched_time, sequential_time / 5)
+
+    def test_scripted_mock_interview(self):
+        client = LLMClient(mock=True)
+        script = ["Software Engineer", "I solve problems using Python.", "end interview"]
+
+        start = time.perf_counter()
+        for _ in range(200):
+            agent = InterviewAgent(client)
+            agent.start()
+            agent.process_inputs(script)
+        elapsed = time.perf_counter() - start
+
+        # Mock mode does no I/O; a full scripted interview should take well under 5ms
+        self.assertLess(elapsed / 200, 0.005)
+
+if __name__ == '__main__':
+    unittest.main()
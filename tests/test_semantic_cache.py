@@ -0,0 +1,49 @@
+import unittest
+from unittest.mock import MagicMock
+import numpy as np
+from src.semantic_cache import SemanticCache
+from src.llm_client import LLMClient
+
+class TestSemanticCache(unittest.TestCase):
+    def test_lookup_hit_and_miss(self):
+        cache = SemanticCache(threshold=0.92)
+        cache.add(np.array([1.0, 0.0, 0.0]), "Role Confirmed: Sales Representative")
+
+        self.assertEqual(cache.lookup(np.array([0.99, 0.05, 0.0])), "Role Confirmed: Sales Representative")
+        self.assertIsNone(cache.lookup(np.array([0.0, 1.0, 0.0])))
+
+    def test_vectors_normalized_on_add(self):
+        cache = SemanticCache()
+        cache.add(np.array([3.0, 4.0]), "scaled")
+        cache.add(np.array([0.0, 0.0]), "zero")
+
+        np.testing.assert_allclose(cache.vectors[0], [0.6, 0.8], rtol=1e-6)
+        # Magnitude does not affect the match, and a zero query never matches
+        self.assertEqual(cache.lookup(np.array([30.0, 40.0])), "scaled")
+        self.assertIsNone(cache.lookup(np.array([0.0, 0.0])))
+
+    def test_fifo_eviction(self):
+        cache = SemanticCache(max_entries=2)
+        cache.add(np.array([1.0, 0.0]), "first")
+        cache.add(np.array([0.0, 1.0]), "second")
+        cache.add(np.array([1.0, 1.0]), "third")
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.responses, ["second", "third"])
+
+    def test_get_response_uses_semantic_key(self):
+        client = LLMClient(api_key="fake-key", mock=False)
+        client.client = MagicMock()
+        completion = MagicMock()
+        completion.choices[0].message.content = "Role Confirmed: Sales Representative"
+        client.client.chat.completions.create.return_value = completion
+        client.embed = MagicMock(side_effect=[np.array([1.0, 0.0]), np.array([0.98, 0.1])])
+
+        first = client.get_response([{"role": "user", "content": "sales"}], semantic_key="sales")
+        second = client.get_response([{"role": "user", "content": "sales rep"}], semantic_key="sales rep")
+
+        self.assertEqual(first, second)
+        self.assertEqual(client.client.chat.completions.create.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()